@@ -5,22 +5,48 @@ load_dotenv()
 
 # OpenAI Configuration
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL")  # e.g. a local fake endpoint for testing
 
 # Email Fetch Configuration
 EMAIL_FETCH_HOURS = 48  # Fetch emails from last 48 hours (24h + delta)
 EMAIL_FETCH_DELTA_HOURS = 24  # Delta buffer
+EMAIL_FETCH_MAX = int(os.getenv("EMAIL_FETCH_MAX", "1000"))  # Cap on messages listed per fetch
+BACKGROUND_JOB_WORKERS = 2  # Web UI fetch/score jobs run on this many threads (one job per kind)
 
 # Database Configuration
 DATABASE_PATH = "email_brief.db"
 
+# SQLite connection tuning (applied to every pooled connection)
+SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "WAL")  # WAL: readers never block the writer
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")  # NORMAL is durable enough under WAL
+SQLITE_CACHE_SIZE = int(os.getenv("SQLITE_CACHE_SIZE", "-20000"))  # Negative = KiB (~20MB page cache)
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))  # Bytes; 0 disables
+SQLITE_TEMP_STORE = os.getenv("SQLITE_TEMP_STORE", "MEMORY")
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))  # Wait this long for a lock
+
 # Gmail OAuth Configuration
 GMAIL_SCOPES = ['https://www.googleapis.com/auth/gmail.readonly']
 GMAIL_CREDENTIALS_FILE = "credentials.json"
 GMAIL_TOKEN_FILE = "token.json"
+GMAIL_API_ENDPOINT = os.getenv("GMAIL_API_ENDPOINT")  # e.g. a local Gmail API stub for testing
+GMAIL_PAGE_SIZE = 100  # Message IDs per list page (Gmail max 500)
+GMAIL_BATCH_SIZE = int(os.getenv("GMAIL_BATCH_SIZE", "50"))  # Requests per batch HTTP call (Gmail max 100)
+GMAIL_MAX_RETRIES = int(os.getenv("GMAIL_MAX_RETRIES", "5"))  # Retries on 429/5xx, with exponential backoff
+GMAIL_FETCH_FORMAT = os.getenv("GMAIL_FETCH_FORMAT", "metadata")  # "metadata" (bodies loaded on open) or "full"
 
 # AI Configuration
 EMBEDDING_MODEL = "text-embedding-3-small"
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "100"))  # Inputs per embeddings request
+EMBEDDING_BATCH_TOKENS = int(os.getenv("EMBEDDING_BATCH_TOKENS", "100000"))  # Estimated tokens per request
+EMBEDDING_CONCURRENCY = int(os.getenv("EMBEDDING_CONCURRENCY", "4"))  # Embeddings requests in flight at once
+EMBEDDING_MAX_INPUT_TOKENS = 8000  # Per-input limit of the embedding model (with headroom)
+EMBEDDING_CACHE_MAX_ENTRIES = int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "10000"))  # ~6KB each at 1536 dims
+IMPORTANT_SENDER_REPUTATION = {'high': 1.0, 'medium': 0.85, 'low': 0.7}  # Least sender reputation of an important_senders match, by priority
+BRIEF_CACHE_MAX_ENTRIES = int(os.getenv("BRIEF_CACHE_MAX_ENTRIES", "100"))  # Generated briefs kept for reuse
 SUMMARY_MODEL = "gpt-4o-mini"
+BRIEF_SUMMARY_CONCURRENCY = int(os.getenv("BRIEF_SUMMARY_CONCURRENCY", "4"))  # Email summary requests in flight at once
+BRIEF_SUMMARY_CHUNK_TOKENS = int(os.getenv("BRIEF_SUMMARY_CHUNK_TOKENS", "3000"))  # Estimated email tokens per summary request
+BRIEF_SUMMARY_MAX_TOKENS = 80  # Output tokens allowed per email summary
 
 # Email Delivery Configuration
 EMAIL_DELIVERY_CONFIG = {
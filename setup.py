@@ -14,6 +14,7 @@ setup(
         "python-dotenv==1.0.0",
         "keyring==24.3.0",
         "flask==3.0.0",
+        "numpy==1.26.2",
     ],
     entry_points={
         "console_scripts": [
@@ -1,87 +1,171 @@
 import numpy as np
-from typing import List, Dict
-from openai import OpenAI
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Optional, Tuple, Callable
+from openai import OpenAI, BadRequestError
 import sys
 import os
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
 
-from config.settings import OPENAI_API_KEY, EMBEDDING_MODEL
-from src.storage.database import Database
-from src.utils.categories import categorize_sender
+from config.settings import (
+    OPENAI_API_KEY, OPENAI_BASE_URL, EMBEDDING_MODEL,
+    EMBEDDING_BATCH_SIZE, EMBEDDING_BATCH_TOKENS, EMBEDDING_MAX_INPUT_TOKENS, EMBEDDING_CONCURRENCY,
+    IMPORTANT_SENDER_REPUTATION,
+)
+from src.storage.database import Database, embedding_cache_key
+from src.storage.reputation import ReputationSnapshot
+from src.ai.similarity import SimilarityIndex
+from src.utils.categories import email_category
+from src.utils.senders import email_sender
 
 
 class ImportanceScorer:
     """Scores email importance using embeddings and user feedback patterns."""
     
     def __init__(self, db: Database):
-        self.client = OpenAI(api_key=OPENAI_API_KEY)
+        self.client = OpenAI(api_key=OPENAI_API_KEY, base_url=OPENAI_BASE_URL)
         self.db = db
         self.embedding_model = EMBEDDING_MODEL
+        self.batch_size = EMBEDDING_BATCH_SIZE
+        self.batch_tokens = EMBEDDING_BATCH_TOKENS
+        self.concurrency = max(1, EMBEDDING_CONCURRENCY)
+        self.similarity = SimilarityIndex.shared(db)
     
-    def get_embedding(self, text: str) -> List[float]:
-        """Get embedding for text using OpenAI."""
+    @staticmethod
+    def estimate_tokens(text: str) -> int:
+        """Rough, conservative token estimate (~3 characters per token)."""
+        return len(text) // 3 + 1
+    
+    def _prepare_input(self, text: str) -> str:
+        """Truncate text so it fits within the model's per-input token limit."""
+        text = text or ' '
+        max_chars = EMBEDDING_MAX_INPUT_TOKENS * 3
+        return text[:max_chars]
+    
+    def _chunk_inputs(self, texts: List[str]) -> List[List[int]]:
+        """Split input indices into requests bounded by batch size and token budget."""
+        chunks = []
+        current = []
+        current_tokens = 0
+        for i, text in enumerate(texts):
+            tokens = self.estimate_tokens(text)
+            if current and (len(current) >= self.batch_size or current_tokens + tokens > self.batch_tokens):
+                chunks.append(current)
+                current = []
+                current_tokens = 0
+            current.append(i)
+            current_tokens += tokens
+        if current:
+            chunks.append(current)
+        return chunks
+    
+    def _embed_chunk(self, texts: List[str], indices: List[int], results: List):
+        """
+        Embed one chunk with a single request, writing vectors into results.
+        
+        If the API rejects the input (400), the chunk is split in half and
+        retried so that a single bad input only loses its own embedding. Rate
+        limits and server or connection errors are left to the client's own
+        retries with backoff; if those run out, the whole chunk is skipped.
+        """
         try:
             response = self.client.embeddings.create(
                 model=self.embedding_model,
-                input=text
+                input=[texts[i] for i in indices]
             )
-            return response.data[0].embedding
+            for item in response.data:
+                results[indices[item.index]] = np.asarray(item.embedding, dtype=np.float32)
+        except BadRequestError as e:
+            if len(indices) == 1:
+                print(f"Error getting embedding: {e}")
+                return
+            middle = len(indices) // 2
+            self._embed_chunk(texts, indices[:middle], results)
+            self._embed_chunk(texts, indices[middle:], results)
         except Exception as e:
-            print(f"Error getting embedding: {e}")
-            return None
+            print(f"Error getting embeddings for {len(indices)} inputs: {e}")
     
-    def cosine_similarity(self, vec1: List[float], vec2: List[float]) -> float:
-        """Calculate cosine similarity between two vectors."""
-        vec1 = np.array(vec1)
-        vec2 = np.array(vec2)
-        return np.dot(vec1, vec2) / (np.linalg.norm(vec1) * np.linalg.norm(vec2))
+    def get_embeddings(self, texts: List[str]) -> List[Optional[np.ndarray]]:
+        """
+        Get embeddings for many texts using batched OpenAI requests.
+        
+        Texts already embedded with the same model are served from the
+        embedding cache; only the misses are sent to the API, with up to
+        EMBEDDING_CONCURRENCY requests in flight.
+        
+        Returns:
+            One float32 vector per input, or None where embedding failed
+        """
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            embeddings, fresh = self._start_embeddings(texts, executor)()
+        self.db.save_cached_embeddings(fresh)
+        return embeddings
     
-    def score_email(self, email: Dict) -> float:
+    def _start_embeddings(self, texts: List[str], executor: ThreadPoolExecutor) -> Callable[[], Tuple[List, Dict]]:
         """
-        Score email importance (0.0 to 1.0).
+        Look up the cache and submit requests for the misses without waiting.
         
-        Factors:
-        1. Sender reputation (from feedback history)
-        2. Similarity to previously marked important emails
-        3. Category reputation (e.g. job responses important, promotions not)
-        4. Subject keywords (basic heuristics)
+        Returns:
+            A function that waits for the requests and returns (embeddings,
+            fresh), where fresh maps new cache keys to vectors for the caller
+            to save
+        """
+        texts = [self._prepare_input(text) for text in texts]
+        keys = [embedding_cache_key(self.embedding_model, text) for text in texts]
+        cached = self.db.get_cached_embeddings(list(set(keys)))
+        results = [cached.get(key) for key in keys]
+        
+        # Embed each distinct missing text once
+        missing = {}
+        for i, key in enumerate(keys):
+            if results[i] is None:
+                missing.setdefault(key, i)
+        miss_texts = [texts[i] for i in missing.values()]
+        miss_results = [None] * len(miss_texts)
+        futures = [executor.submit(self._embed_chunk, miss_texts, indices, miss_results)
+                   for indices in self._chunk_inputs(miss_texts)]
+        
+        def finish():
+            for future in futures:
+                future.result()
+            fresh = {key: embedding for key, embedding in zip(missing, miss_results) if embedding is not None}
+            return [fresh.get(key) if embedding is None else embedding
+                    for key, embedding in zip(keys, results)], fresh
+        
+        return finish
+    
+    def get_embedding(self, text: str) -> Optional[np.ndarray]:
+        """Get embedding for text using OpenAI."""
+        return self.get_embeddings([text])[0]
+    
+    def max_similarities(self, embeddings) -> Optional[np.ndarray]:
+        """Max similarity to any important email for each row of embeddings (one matmul)."""
+        return self.similarity.max_similarities(embeddings, self.db)
+    
+    def _reputation_score(self, email: Dict, reputation: ReputationSnapshot) -> float:
+        """
+        Sender (0-0.35 weight) and category (0-0.2 weight) reputation, from the snapshot.
+        
+        A sender listed in important_senders, by address or by its domain or
+        a parent domain, has at least its priority's IMPORTANT_SENDER_REPUTATION.
         """
         score = 0.0
         
-        # Factor 1: Sender reputation (0-0.35 weight)
-        sender = email.get('sender', '')
-        sender_reputation = self.db.get_sender_reputation(sender)
+        # Factor 1: Sender reputation (0-0.35 weight), by address or else domain
+        address, domain = email_sender(email)
+        sender_reputation = reputation.sender_reputation(address, domain)
+        priority = reputation.important_sender_priority(address, domain)
+        if priority:
+            sender_reputation = max(sender_reputation, IMPORTANT_SENDER_REPUTATION.get(priority, 0.0))
         score += sender_reputation * 0.35
         
         # Category reputation (auto-rank/group: e.g. mark one job email important -> more weight for Work/Jobs)
-        category = categorize_sender(email.get('sender', ''), email.get('subject', ''))
-        category_reputation = self.db.get_category_reputation(category)
-        score += category_reputation * 0.2
+        category = email_category(email)
+        score += reputation.category_reputation(category) * 0.2
         
-        # Factor 2: Similarity to important emails (0-0.4 weight)
-        email_text = f"{email.get('subject', '')} {email.get('snippet', '')}"
-        embedding = self.get_embedding(email_text)
-        
-        if embedding:
-            # Save embedding
-            self.db.save_embedding(email['id'], embedding)
-            
-            # Compare with important emails
-            important_embeddings = self.db.get_important_emails_embeddings()
-            if important_embeddings:
-                max_similarity = 0.0
-                for _, imp_embedding in important_embeddings:
-                    similarity = self.cosine_similarity(embedding, imp_embedding)
-                    max_similarity = max(max_similarity, similarity)
-                
-                score += max_similarity * 0.35
-            else:
-                # No feedback yet, use neutral score
-                score += 0.175
-        else:
-            score += 0.175
-        
-        # Factor 4: Basic keyword heuristics (0-0.1 weight)
+        return score
+    
+    def _keyword_score(self, email: Dict) -> float:
+        """Basic keyword heuristics (0-0.1 weight)."""
         subject_lower = email.get('subject', '').lower()
         important_keywords = ['urgent', 'important', 'action required', 'deadline', 'meeting']
         not_important_keywords = ['unsubscribe', 'newsletter', 'promotion', 'spam']
@@ -97,9 +181,69 @@ class ImportanceScorer:
                 keyword_score -= 0.1
                 break
         
-        score += max(0, min(0.1, keyword_score + 0.05))
+        return max(0, min(0.1, keyword_score + 0.05))
+    
+    def score_email(self, email: Dict) -> float:
+        """
+        Score email importance (0.0 to 1.0).
         
-        # Normalize to 0-1 range
-        score = max(0.0, min(1.0, score))
+        Factors:
+        1. Sender reputation (from feedback history)
+        2. Similarity to previously marked important emails
+        3. Category reputation (e.g. job responses important, promotions not)
+        4. Subject keywords (basic heuristics)
+        """
+        return self.score_emails([email])[0]
+    
+    def score_emails(self, emails: List[Dict]) -> List[float]:
+        """
+        Score a batch of emails; same factors as score_email.
         
-        return score
+        Subjects and snippets are embedded in a handful of batched requests
+        (see EMBEDDING_BATCH_SIZE / EMBEDDING_BATCH_TOKENS, up to
+        EMBEDDING_CONCURRENCY at once) while the reputation lookups run, then
+        compared with important emails in one matrix multiply. All writes
+        share one transaction. An email whose embedding fails gets the
+        neutral similarity score.
+        
+        Returns:
+            Scores in the same order as emails
+        """
+        if not emails:
+            return []
+        
+        texts = [f"{email.get('subject', '')} {email.get('snippet', '')}" for email in emails]
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            finish_embeddings = self._start_embeddings(texts, executor)
+            
+            # Reputation and keyword factors are computed while the embedding requests are in flight
+            reputation = self.db.get_reputation_snapshot()
+            base_scores = [self._reputation_score(email, reputation) + self._keyword_score(email)
+                           for email in emails]
+            
+            embeddings, fresh = finish_embeddings()
+        
+        # One transaction for every write; embeddings are saved before the similarity
+        # lookup so newly embedded important emails join the comparison
+        embedded = [i for i, embedding in enumerate(embeddings) if embedding is not None]
+        with self.db.transaction():
+            self.db.save_cached_embeddings(fresh)
+            for i in embedded:
+                self.db.save_embedding(emails[i]['id'], embeddings[i])
+        
+        # Factor 2: Similarity to important emails (0-0.35 weight)
+        similarity_scores = [0.175] * len(emails)  # Neutral when no embedding or no feedback yet
+        if embedded:
+            similarities = self.max_similarities(np.vstack([embeddings[i] for i in embedded]))
+            if similarities is not None:
+                for i, similarity in zip(embedded, similarities):
+                    similarity_scores[i] = float(similarity) * 0.35
+        
+        scores = []
+        for base_score, similarity_score in zip(base_scores, similarity_scores):
+            score = base_score + similarity_score
+            
+            # Normalize to 0-1 range
+            scores.append(max(0.0, min(1.0, score)))
+        
+        return scores
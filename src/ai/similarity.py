@@ -0,0 +1,79 @@
+import threading
+import numpy as np
+from typing import Dict, Optional
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+
+from src.storage.database import Database
+
+
+class SimilarityIndex:
+    """
+    Important-email embeddings kept as one pre-normalized N x D float32 matrix.
+    
+    Max cosine similarity for a batch of emails is a single matrix multiply.
+    The matrix is reloaded only when Database.get_feedback_version() changes,
+    i.e. when feedback is added/removed or an important email gets an embedding.
+    """
+    
+    _shared: Dict[str, 'SimilarityIndex'] = {}
+    _shared_lock = threading.Lock()
+    
+    def __init__(self, db: Database):
+        self.db = db
+        self._lock = threading.Lock()
+        self._version = None
+        self._matrix = np.empty((0, 0), dtype=np.float32)
+    
+    @classmethod
+    def shared(cls, db: Database) -> 'SimilarityIndex':
+        """Process-wide index for db's file, so the matrix survives across requests."""
+        with cls._shared_lock:
+            index = cls._shared.get(db.db_path)
+            if index is None:
+                index = cls._shared[db.db_path] = cls(db)
+            return index
+    
+    @staticmethod
+    def normalize(vectors) -> np.ndarray:
+        """L2-normalize rows (zero vectors stay zero)."""
+        matrix = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return np.ascontiguousarray(matrix / norms)
+    
+    def refresh(self, db: Database = None):
+        """Reload the matrix if feedback changed since the last load."""
+        db = db or self.db
+        version = db.get_feedback_version()
+        if version == self._version:
+            return
+        with self._lock:
+            if version == self._version:
+                return
+            _, matrix = db.get_important_embeddings()
+            self._matrix = self.normalize(matrix) if len(matrix) else np.empty((0, 0), dtype=np.float32)
+            self._version = version
+    
+    def __len__(self) -> int:
+        return len(self._matrix)
+    
+    def max_similarities(self, embeddings, db: Database = None) -> Optional[np.ndarray]:
+        """
+        Max cosine similarity of each embedding to any important email.
+        
+        Args:
+            embeddings: One vector or an (M, D) array of vectors
+            db: Connection to check for changes (defaults to the index's own)
+        
+        Returns:
+            Array of M similarities clipped at 0, or None if there are no
+            important embeddings yet
+        """
+        self.refresh(db)
+        matrix = self._matrix
+        if not len(matrix):
+            return None
+        queries = self.normalize(embeddings)
+        return np.maximum((queries @ matrix.T).max(axis=1), 0.0)
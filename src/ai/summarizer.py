@@ -2,50 +2,80 @@ import sys
 import os
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
 
-from typing import List, Dict
+import json
+import hashlib
+import re
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Optional, Iterator
 from openai import OpenAI
-from config.settings import OPENAI_API_KEY, SUMMARY_MODEL
+from config.settings import (
+    OPENAI_API_KEY, OPENAI_BASE_URL, SUMMARY_MODEL,
+    BRIEF_SUMMARY_CONCURRENCY, BRIEF_SUMMARY_CHUNK_TOKENS, BRIEF_SUMMARY_MAX_TOKENS,
+)
+from src.storage.database import Database
+from src.utils.categories import email_category
+from src.utils.brief_html import BriefHtmlNormalizer
+
+# Bump when the prompt or the HTML clean-up changes, so cached briefs are regenerated
+PROMPT_VERSION = 6
+# Bump when the per-email summary prompt changes, so stored summaries are regenerated
+SUMMARY_PROMPT_VERSION = 1
+
+SYSTEM_MESSAGE = {"role": "system", "content": "You are a helpful email assistant that creates concise, actionable daily email briefs. Always format your response as clean HTML with proper structure. Use <h2> for main sections, <h3> for individual email titles, <p> for paragraphs, <ul> and <li> for lists, <strong> for emphasis, and <div class='email-item-brief'> to wrap each email. Never use markdown syntax."}
+
+# One "<number>: <summary>" line of a summary reply
+SUMMARY_LINE = re.compile(r'^\s*(\d+)[.:)]\s*(.+?)\s*$', flags=re.MULTILINE)
 
 
 class BriefSummarizer:
-    """Generates daily email brief using OpenAI."""
+    """
+    Generates daily email brief using OpenAI.
     
-    def __init__(self):
-        self.client = OpenAI(api_key=OPENAI_API_KEY)
+    Each email is summarized in one sentence first, and the brief is written
+    from those summaries. Each summary is stored in email_summaries keyed by
+    email id and a hash of what the model saw, so only emails new since the
+    last brief are summarized again. With a database, finished briefs are
+    also cached in brief_cache: asking again for the same top emails (same
+    IDs, order and displayed scores) returns the stored brief without an
+    API call.
+    """
+    
+    def __init__(self, db: Optional[Database] = None):
+        self.client = OpenAI(api_key=OPENAI_API_KEY, base_url=OPENAI_BASE_URL)
         self.model = SUMMARY_MODEL
+        self.db = db
     
-    def generate_brief(self, emails: List[Dict], top_n: int = 10) -> str:
-        """
-        Generate a daily brief from top N important emails.
-        
-        Args:
-            emails: List of emails sorted by importance
-            top_n: Number of top emails to include
-            
-        Returns:
-            Formatted brief text
-        """
-        if not emails:
-            return "No emails found in the last 24-48 hours."
-        
-        # Get top N emails
-        top_emails = emails[:top_n]
-        
-        # Format emails for prompt
-        email_texts = []
-        for i, email in enumerate(top_emails, 1):
-            email_texts.append(
-                f"{i}. From: {email['sender']}\n"
-                f"   Subject: {email['subject']}\n"
-                f"   Date: {email['date']}\n"
-                f"   Preview: {email.get('snippet', '')[:200]}\n"
-                f"   Importance Score: {email.get('importance_score', 0):.2f}\n"
-            )
-        
+    def brief_cache_key(self, top_emails: List[Dict]) -> str:
+        """Hash of the model, PROMPT_VERSION and the ordered (id, score) pairs of top_emails."""
+        # Scores are keyed as the prompt shows them, so changes it can't see don't regenerate
+        payload = json.dumps([
+            self.model,
+            PROMPT_VERSION,
+            [[email['id'], f"{email.get('importance_score', 0):.2f}"] for email in top_emails]
+        ])
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+    
+    @staticmethod
+    def _format_email(i: int, email: Dict) -> str:
+        # No score here: a stored summary must stay valid while the score changes
+        return (
+            f"{i}. From: {email['sender']}\n"
+            f"   Subject: {email['subject']}\n"
+            f"   Date: {email['date']}\n"
+            f"   Preview: {(email.get('snippet') or '')[:200]}\n"
+        )
+    
+    def summary_hash(self, email: Dict) -> str:
+        """Hash of everything that shapes an email's summary (model, prompt and the email text)."""
+        payload = json.dumps([self.model, SUMMARY_PROMPT_VERSION, self._format_email(0, email)])
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+    
+    def _request(self, top_emails: List[Dict], summaries: Dict[str, str], stream: bool = False):
+        """Chat completion request writing the brief from the per-email summaries, grouped by category."""
         prompt = f"""You are a helpful email assistant. Create a concise daily email brief from these important emails.
 
-Emails:
-{chr(10).join(email_texts)}
+Summaries of {len(top_emails)} emails, grouped by category:
+{self._summary_digest(top_emails, summaries)}
 
 Create a brief that:
 1. Highlights the most critical emails that need attention
@@ -63,67 +93,187 @@ IMPORTANT: Format your response as clean HTML. Use:
 - Use class="critical" for urgent emails, class="important" for important ones
 
 Do NOT use markdown. Use proper HTML tags only."""
+        
+        return self.client.chat.completions.create(
+            model=self.model,
+            messages=[
+                SYSTEM_MESSAGE,
+                {"role": "user", "content": prompt}
+            ],
+            temperature=0.7,
+            max_tokens=2000,
+            stream=stream
+        )
+    
+    @staticmethod
+    def _summary_digest(top_emails: List[Dict], summaries: Dict[str, str]) -> str:
+        """
+        Reduce-step input: one line per email under its category heading.
+        
+        Categories keep the order of their most important email. An email
+        without a summary is shown by its preview instead.
+        """
+        groups = {}
+        for i, email in enumerate(top_emails, 1):
+            summary = summaries.get(email['id']) or f"Preview: {(email.get('snippet') or '')[:200]}"
+            groups.setdefault(email_category(email), []).append(
+                f"{i}. From: {email['sender']} | Subject: {email['subject']} | "
+                f"Importance Score: {email.get('importance_score', 0):.2f}\n   {summary}"
+            )
+        return '\n\n'.join(f"[{category}]\n" + '\n'.join(lines) for category, lines in groups.items())
+    
+    def _summary_chunks(self, emails: List[Dict]) -> List[List[Dict]]:
+        """Split emails into summary requests of at most BRIEF_SUMMARY_CHUNK_TOKENS (estimated, ~3 characters per token)."""
+        chunks = []
+        current = []
+        current_tokens = 0
+        for email in emails:
+            tokens = len(self._format_email(0, email)) // 3 + 1
+            if current and current_tokens + tokens > BRIEF_SUMMARY_CHUNK_TOKENS:
+                chunks.append(current)
+                current = []
+                current_tokens = 0
+            current.append(email)
+            current_tokens += tokens
+        if current:
+            chunks.append(current)
+        return chunks
+    
+    def _summarize_chunk(self, emails: List[Dict]) -> Dict[str, str]:
+        """
+        One map request summarizing several emails.
+        
+        Returns:
+            email id -> summary, for the emails the model answered (none if
+            the request failed)
+        """
+        email_texts = [self._format_email(i, email) for i, email in enumerate(emails, 1)]
+        prompt = f"""Summarize each of these emails in one sentence for a daily brief: what it is about and any action or deadline for the reader.
+
+Emails:
+{chr(10).join(email_texts)}
 
+Reply with exactly one line per email, in the form "<number>: <summary>". Plain text only, no preamble."""
         try:
             response = self.client.chat.completions.create(
                 model=self.model,
-                messages=[
-                    {"role": "system", "content": "You are a helpful email assistant that creates concise, actionable daily email briefs. Always format your response as clean HTML with proper structure. Use <h2> for main sections, <h3> for individual email titles, <p> for paragraphs, <ul> and <li> for lists, <strong> for emphasis, and <div class='email-item-brief'> to wrap each email. Never use markdown syntax."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.7,
-                max_tokens=2000
+                messages=[{"role": "user", "content": prompt}],
+                temperature=0.3,
+                max_tokens=BRIEF_SUMMARY_MAX_TOKENS * len(emails)
             )
-            
-            brief_html = response.choices[0].message.content.strip()
-            
-            # Clean up any markdown that might have slipped through
-            import re
-            # Remove markdown header separators
-            brief_html = re.sub(r'^=+\s*$', '', brief_html, flags=re.MULTILINE)
-            # Convert markdown headers to HTML if needed
-            brief_html = re.sub(r'^###\s+(.+)$', r'<h3>\1</h3>', brief_html, flags=re.MULTILINE)
-            brief_html = re.sub(r'^##\s+(.+)$', r'<h2>\1</h2>', brief_html, flags=re.MULTILINE)
-            brief_html = re.sub(r'^#\s+(.+)$', r'<h1>\1</h1>', brief_html, flags=re.MULTILINE)
-            # Convert markdown bold
-            brief_html = re.sub(r'\*\*(.+?)\*\*', r'<strong>\1</strong>', brief_html)
-            # Convert markdown lists (handle both - and *)
-            brief_html = re.sub(r'^[-*]\s+(.+)$', r'<li>\1</li>', brief_html, flags=re.MULTILINE)
-            # Convert numbered lists
-            brief_html = re.sub(r'^\d+\.\s+(.+)$', r'<li>\1</li>', brief_html, flags=re.MULTILINE)
-            
-            # Wrap consecutive <li> in <ul>
-            lines = brief_html.split('\n')
-            result = []
-            in_list = False
-            for line in lines:
-                stripped = line.strip()
-                if stripped.startswith('<li>'):
-                    if not in_list:
-                        result.append('<ul>')
-                        in_list = True
-                    result.append(line)
-                elif stripped.startswith('</li>') or stripped.startswith('</ul>') or stripped.startswith('</ol>'):
-                    if in_list:
-                        result.append('</ul>')
-                        in_list = False
-                    result.append(line)
-                else:
-                    if in_list and not stripped.startswith('<'):
-                        result.append('</ul>')
-                        in_list = False
-                    result.append(line)
-            if in_list:
-                result.append('</ul>')
-            brief_html = '\n'.join(result)
-            
-            # Clean up extra whitespace
-            brief_html = re.sub(r'\n{3,}', '\n\n', brief_html)
-            
-            # Don't add header - dashboard already has one
-            # Just return the brief content directly
-            
-            return brief_html
-            
+            text = response.choices[0].message.content
         except Exception as e:
-            return f"Error generating brief: {e}\n\nTop emails:\n" + "\n".join([f"- {e['subject']} ({e['sender']})" for e in top_emails[:5]])
+            print(f"Error summarizing emails: {e}")
+            return {}
+        
+        summaries = {}
+        for match in SUMMARY_LINE.finditer(text):
+            index = int(match.group(1)) - 1
+            if 0 <= index < len(emails):
+                summaries[emails[index]['id']] = match.group(2)
+        return summaries
+    
+    def _email_summaries(self, top_emails: List[Dict]) -> Dict[str, str]:
+        """
+        Map step: a one-sentence summary per email, reusing stored ones.
+        
+        Emails without a stored summary are requested per category, in
+        chunks of BRIEF_SUMMARY_CHUNK_TOKENS, up to BRIEF_SUMMARY_CONCURRENCY
+        at once; new summaries are saved.
+        
+        Returns:
+            email id -> summary (emails the model didn't answer are missing)
+        """
+        hashes = {email['id']: self.summary_hash(email) for email in top_emails}
+        summaries = self.db.get_email_summaries(hashes) if self.db is not None else {}
+        
+        groups = {}
+        for email in top_emails:
+            if email['id'] not in summaries:
+                groups.setdefault(email_category(email), []).append(email)
+        chunks = [chunk for emails in groups.values() for chunk in self._summary_chunks(emails)]
+        
+        fresh = {}
+        with ThreadPoolExecutor(max_workers=max(1, BRIEF_SUMMARY_CONCURRENCY)) as executor:
+            for result in executor.map(self._summarize_chunk, chunks):
+                fresh.update(result)
+        if fresh and self.db is not None:
+            self.db.save_email_summaries({email_id: (hashes[email_id], summary)
+                                          for email_id, summary in fresh.items()}, self.model)
+        summaries.update(fresh)
+        return summaries
+    
+    def _cached(self, cache_key: str) -> Optional[str]:
+        return self.db.get_cached_brief(cache_key) if self.db is not None else None
+    
+    def _save(self, cache_key: str, brief_html: str):
+        if self.db is not None:
+            self.db.save_cached_brief(cache_key, brief_html, self.model)
+    
+    @staticmethod
+    def _fallback(error: Exception, top_emails: List[Dict]) -> str:
+        return f"Error generating brief: {error}\n\nTop emails:\n" + "\n".join([f"- {e['subject']} ({e['sender']})" for e in top_emails[:5]])
+    
+    def generate_brief(self, emails: List[Dict], top_n: int = 10) -> str:
+        """
+        Generate a daily brief from top N important emails.
+        
+        Args:
+            emails: List of emails sorted by importance
+            top_n: Number of top emails to include
+        
+        Returns:
+            Formatted brief text
+        """
+        return ''.join(self.stream_brief(emails, top_n))
+    
+    def stream_brief(self, emails: List[Dict], top_n: int = 10) -> Iterator[str]:
+        """
+        Generate the same brief as generate_brief, yielding HTML as it arrives.
+        
+        Each chunk is one or more complete, normalized lines, so the first
+        shows up as soon as the model finishes its first line (after the
+        emails without a stored summary are summarized). A cached
+        brief is yielded in one piece. A finished brief is cached unless an
+        email summary is missing, so that email is retried next time.
+        
+        Yields:
+            HTML fragments; their concatenation is the full brief
+        """
+        if not emails:
+            yield "No emails found in the last 24-48 hours."
+            return
+        
+        # Get top N emails
+        top_emails = emails[:top_n]
+        
+        cache_key = self.brief_cache_key(top_emails)
+        cached = self._cached(cache_key)
+        if cached is not None:
+            yield cached
+            return
+        
+        summaries = self._email_summaries(top_emails)
+        
+        normalizer = BriefHtmlNormalizer()
+        parts = []
+        try:
+            for chunk in self._request(top_emails, summaries, stream=True):
+                text = chunk.choices[0].delta.content if chunk.choices else None
+                html = normalizer.feed(text) if text else ''
+                if html:
+                    parts.append(html)
+                    yield html
+            html = normalizer.close()
+            if html:
+                parts.append(html)
+                yield html
+        except Exception as e:
+            yield ('\n\n' if parts else '') + self._fallback(e, top_emails)
+            return
+        
+        missing = sum(1 for email in top_emails if email['id'] not in summaries)
+        if missing:
+            print(f"Brief not cached: {missing} email summaries are missing and will be retried")
+            return
+        self._save(cache_key, ''.join(parts))
@@ -1,3 +1,4 @@
 from .gmail import GmailConnector
+from .sync import sync_emails, iter_sync_pages, get_email_with_body
 
-__all__ = ['GmailConnector']
+__all__ = ['GmailConnector', 'sync_emails', 'iter_sync_pages', 'get_email_with_body']
@@ -8,6 +8,7 @@ import sys
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
 
 from config.settings import EMAIL_DELIVERY_CONFIG
+from src.utils.brief_html import brief_email_html
 
 
 class EmailDelivery:
@@ -64,47 +65,7 @@ class EmailDelivery:
     
     def _format_brief_html(self, brief_text: str) -> str:
         """Format brief as HTML."""
-        lines = brief_text.split('\n')
-        html = """
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <style>
-                body { font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', sans-serif; 
-                       line-height: 1.6; color: #333; max-width: 800px; margin: 0 auto; padding: 20px; }
-                h1 { color: #1e3c72; border-bottom: 3px solid #f5a623; padding-bottom: 10px; }
-                .email-item { background: #f8f9fa; padding: 15px; margin: 15px 0; 
-                             border-left: 4px solid #2a5298; border-radius: 4px; }
-                .score { color: #f5a623; font-weight: bold; }
-                .footer { margin-top: 30px; padding-top: 20px; border-top: 1px solid #ddd; 
-                         color: #666; font-size: 12px; }
-            </style>
-        </head>
-        <body>
-        """
-        
-        for line in lines:
-            if line.startswith('='):
-                html += f"<hr>"
-            elif line.startswith('📬'):
-                html += f"<h1>{line}</h1>"
-            elif line.startswith('From:') or line.startswith('Subject:'):
-                html += f"<p><strong>{line}</strong></p>"
-            elif line.strip():
-                html += f"<p>{line}</p>"
-            else:
-                html += "<br>"
-        
-        html += """
-            <div class="footer">
-                <p>This brief was generated by Daily Email Brief.</p>
-                <p>To adjust your preferences, run: python main.py preferences</p>
-            </div>
-        </body>
-        </html>
-        """
-        
-        return html
+        return brief_email_html(brief_text)
     
     def _send_via_smtp(self, msg: MIMEMultipart, recipient: str):
         """Send email via SMTP."""
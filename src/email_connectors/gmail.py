@@ -1,9 +1,11 @@
 import os
 import base64
 import json
+import time
+import random
 from datetime import datetime, timedelta
 from email.utils import parsedate_to_datetime
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple, Iterator
 
 from google.auth.transport.requests import Request
 from google.oauth2.credentials import Credentials
@@ -11,22 +13,46 @@ from google.auth.exceptions import RefreshError
 from google_auth_oauthlib.flow import InstalledAppFlow
 from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
+from googleapiclient.http import BatchHttpRequest
 
 import sys
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
 
-from config.settings import GMAIL_SCOPES, GMAIL_CREDENTIALS_FILE, GMAIL_TOKEN_FILE, EMAIL_FETCH_HOURS
+from config.settings import (
+    GMAIL_SCOPES, GMAIL_CREDENTIALS_FILE, GMAIL_TOKEN_FILE, EMAIL_FETCH_HOURS,
+    GMAIL_API_ENDPOINT, GMAIL_BATCH_SIZE, GMAIL_MAX_RETRIES, GMAIL_PAGE_SIZE, EMAIL_FETCH_MAX,
+    GMAIL_FETCH_FORMAT,
+)
+
+# Rate limiting and transient server errors worth retrying
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+
+# Only the headers we store are requested in metadata mode
+METADATA_HEADERS = ['Subject', 'From', 'Date']
+
+# Partial-response masks: just the parts of a message resource that _parse_message reads
+MESSAGE_FIELDS = {
+    'metadata': 'id,threadId,snippet,payload/headers',
+    'full': 'id,threadId,snippet,payload(mimeType,headers,body/data,parts(mimeType,body/data))',
+}
 
 
 class GmailConnector:
     """Gmail connector using OAuth2 for authentication."""
     
-    def __init__(self):
+    def __init__(self, fetch_format: str = GMAIL_FETCH_FORMAT):
         self.service = None
         self.creds = None
+        self.fetch_format = fetch_format  # 'metadata' leaves 'body' as None until get_message_body
         
-    def authenticate(self) -> bool:
-        """Authenticate with Gmail API using OAuth2."""
+    def authenticate(self, interactive: bool = True) -> bool:
+        """
+        Authenticate with Gmail API using OAuth2.
+        
+        Args:
+            interactive: Run the browser consent flow when there is no usable
+                token; with False, only an existing (refreshable) token is used
+        """
         creds = None
         
         # Load existing token
@@ -47,6 +73,8 @@ class GmailConnector:
                             pass
                     return False
             else:
+                if not interactive:
+                    return False
                 if not os.path.exists(GMAIL_CREDENTIALS_FILE):
                     print(f"Error: {GMAIL_CREDENTIALS_FILE} not found.")
                     print("Please download OAuth2 credentials from Google Cloud Console:")
@@ -62,67 +90,305 @@ class GmailConnector:
                 token.write(creds.to_json())
         
         self.creds = creds
-        self.service = build('gmail', 'v1', credentials=creds)
+        client_options = {'api_endpoint': GMAIL_API_ENDPOINT} if GMAIL_API_ENDPOINT else None
+        self.service = build('gmail', 'v1', credentials=creds, client_options=client_options)
         return True
     
-    def fetch_recent_emails(self, hours: int = EMAIL_FETCH_HOURS) -> List[Dict]:
+    def fetch_recent_emails(self, hours: int = EMAIL_FETCH_HOURS,
+                            max_messages: int = EMAIL_FETCH_MAX) -> List[Dict]:
         """
         Fetch emails from the last N hours.
         
         Args:
             hours: Number of hours to look back (default from config)
+            max_messages: Stop after this many messages (default from config)
             
         Returns:
             List of email dictionaries with metadata and content
         """
+        emails = []
+        for page in self.iter_recent_emails(hours, max_messages):
+            emails.extend(page)
+        return emails
+    
+    def iter_recent_emails(self, hours: int = EMAIL_FETCH_HOURS,
+                           max_messages: int = EMAIL_FETCH_MAX) -> Iterator[List[Dict]]:
+        """Yield emails from the last N hours one listing page at a time."""
         if not self.service:
             if not self.authenticate():
-                return []
+                return
+        
+        for message_ids in self._guard_pages(self._window_message_id_pages(hours, max_messages)):
+            yield self.get_messages(message_ids)
+    
+    def sync_message_id_pages(self, hours: int = EMAIL_FETCH_HOURS, start_history_id: str = None,
+                              max_messages: int = EMAIL_FETCH_MAX) -> Optional[Iterator[List[str]]]:
+        """
+        List message IDs that need syncing, one page at a time.
+        
+        With start_history_id, only messages added since then are listed via
+        users.history.list. Without one, or if that history has expired, falls
+        back to listing the last N hours (newest first, capped at max_messages).
+        
+        Returns:
+            An iterator of message ID lists, or None if listing could not
+            start. Errors listing a later page are raised from the iterator
+            (HttpError, or RefreshError), so the caller can tell an incomplete
+            listing from a finished one.
+        """
+        if not self.service:
+            if not self.authenticate():
+                return None
         
         try:
-            # Calculate cutoff time
-            cutoff_time = datetime.now() - timedelta(hours=hours)
-            cutoff_timestamp = int(cutoff_time.timestamp())
-            
-            # Query for emails after cutoff time
-            query = f'after:{cutoff_timestamp}'
-            
-            # Get list of messages (token refresh can happen on any API call and raise RefreshError)
-            results = self.service.users().messages().list(
-                userId='me', q=query, maxResults=100).execute()
-            messages = results.get('messages', [])
-            
-            emails = []
-            for msg in messages:
-                try:
-                    email_data = self._get_message_details(msg['id'])
-                    if email_data:
-                        emails.append(email_data)
-                except Exception as e:
-                    print(f"Error fetching message {msg['id']}: {e}")
-                    continue
-            
-            return emails
-            
+            pages = None
+            if start_history_id:
+                pages = self._history_message_id_pages(start_history_id)
+            if pages is None:
+                pages = self._window_message_id_pages(hours, max_messages)
+            return pages
         except RefreshError:
-            if os.path.exists(GMAIL_TOKEN_FILE):
-                try:
-                    os.remove(GMAIL_TOKEN_FILE)
-                except OSError:
-                    pass
-            raise Exception(
-                'invalid_grant: Your Gmail session expired or was revoked. Please reconnect your account.'
-            )
+            self._invalidate_token()
+        except HttpError as error:
+            print(f"An error occurred: {error}")
+            return None
+    
+    def get_profile(self) -> Optional[Dict]:
+        """
+        The signed-in mailbox: its emailAddress and current historyId.
+        
+        The historyId is the starting point for the next incremental sync, so
+        it should be read before listing.
+        
+        Returns:
+            The users.getProfile resource, or None if not signed in or the
+            request failed
+        """
+        if not self.service:
+            if not self.authenticate():
+                return None
+        
+        try:
+            return self.service.users().getProfile(userId='me').execute(num_retries=GMAIL_MAX_RETRIES)
+        except RefreshError:
+            self._invalidate_token()
         except HttpError as error:
             print(f"An error occurred: {error}")
-            return []
+            return None
+    
+    def _guard_pages(self, pages: Iterator[List[str]]) -> Iterator[List[str]]:
+        """Apply the usual token/HTTP error handling to lazily listed pages."""
+        try:
+            yield from pages
+        except RefreshError:
+            self._invalidate_token()
+        except HttpError as error:
+            print(f"An error occurred: {error}")
+    
+    def _window_message_id_pages(self, hours: int, max_messages: int) -> Iterator[List[str]]:
+        """Yield pages of IDs of messages received in the last N hours, following nextPageToken."""
+        # Calculate cutoff time
+        cutoff_time = datetime.now() - timedelta(hours=hours)
+        cutoff_timestamp = int(cutoff_time.timestamp())
+        
+        # Query for emails after cutoff time
+        query = f'after:{cutoff_timestamp}'
+        
+        remaining = max_messages
+        page_token = None
+        while remaining > 0:
+            results = self.service.users().messages().list(
+                userId='me', q=query, maxResults=min(GMAIL_PAGE_SIZE, remaining),
+                pageToken=page_token).execute(num_retries=GMAIL_MAX_RETRIES)
+            message_ids = [msg['id'] for msg in results.get('messages', [])][:remaining]
+            if message_ids:
+                remaining -= len(message_ids)
+                yield message_ids
+            page_token = results.get('nextPageToken')
+            if not page_token:
+                return
+        print(f"Reached the limit of {max_messages} messages; older messages in the window were skipped")
+    
+    def _history_message_id_pages(self, start_history_id: str) -> Optional[Iterator[List[str]]]:
+        """
+        Pages of IDs of messages added since start_history_id.
+        
+        Only messageAdded records matter: message content never changes, and
+        label changes don't affect what we store. Spam and trash are skipped
+        like messages.list does.
+        
+        Returns:
+            An iterator of ID pages, or None if start_history_id is too old
+            (HTTP 404) and a full windowed list is needed
+        """
+        def request(page_token):
+            return self.service.users().history().list(
+                userId='me', startHistoryId=start_history_id, historyTypes=['messageAdded'],
+                maxResults=GMAIL_PAGE_SIZE, pageToken=page_token).execute(num_retries=GMAIL_MAX_RETRIES)
+        
+        # The first page is requested eagerly so an expired history can fall back
+        try:
+            first = request(None)
+        except HttpError as error:
+            if error.resp.status == 404:
+                print("Gmail history expired, falling back to a full fetch")
+                return None
+            raise
+        
+        def pages():
+            seen = set()
+            results = first
+            while True:
+                message_ids = []
+                for record in results.get('history', []):
+                    for added in record.get('messagesAdded', []):
+                        message = added['message']
+                        labels = set(message.get('labelIds', []))
+                        if message['id'] in seen or labels & {'SPAM', 'TRASH'}:
+                            continue
+                        seen.add(message['id'])
+                        message_ids.append(message['id'])
+                if message_ids:
+                    yield message_ids
+                page_token = results.get('nextPageToken')
+                if not page_token:
+                    return
+                results = request(page_token)
+        
+        return pages()
+    
+    def get_messages(self, message_ids: List[str]) -> List[Dict]:
+        """
+        Download and parse messages by ID.
+        
+        Returns:
+            Parsed emails, in the order of message_ids (see download_messages)
+        """
+        return self.download_messages(message_ids)[0]
+    
+    def download_messages(self, message_ids: List[str]) -> Tuple[List[Dict], List[str]]:
+        """
+        Download and parse messages by ID, reporting those that are still failing.
+        
+        Messages are fetched GMAIL_BATCH_SIZE at a time in Gmail batch HTTP
+        requests. Messages rejected with 429/5xx are retried with exponential
+        backoff up to GMAIL_MAX_RETRIES times; other failures (e.g. a message
+        deleted since it was listed) are skipped.
+        
+        Returns:
+            (emails, unavailable): parsed emails in the order of message_ids,
+            and the IDs given up on after retries (worth trying again later)
+        """
+        if not message_ids:
+            return [], []
+        
+        emails = {}
+        pending = list(dict.fromkeys(message_ids))
+        try:
+            for attempt in range(GMAIL_MAX_RETRIES + 1):
+                if attempt:
+                    time.sleep(min(32, 2 ** (attempt - 1)) + random.random())
+                retry = []
+                for start in range(0, len(pending), GMAIL_BATCH_SIZE):
+                    retry.extend(self._get_messages_batch(pending[start:start + GMAIL_BATCH_SIZE], emails))
+                pending = retry
+                if not pending:
+                    break
+        except RefreshError:
+            self._invalidate_token()
+        
+        if pending:
+            print(f"Giving up on {len(pending)} messages after {GMAIL_MAX_RETRIES} retries")
+        return [emails[msg_id] for msg_id in message_ids if msg_id in emails], pending
+    
+    def _new_batch(self, callback) -> BatchHttpRequest:
+        """Create a batch request (pointed at GMAIL_API_ENDPOINT when overridden)."""
+        if GMAIL_API_ENDPOINT:
+            return BatchHttpRequest(callback=callback,
+                                    batch_uri=GMAIL_API_ENDPOINT.rstrip('/') + '/batch/gmail/v1')
+        return self.service.new_batch_http_request(callback=callback)
+    
+    def _get_messages_batch(self, message_ids: List[str], results: Dict[str, Dict]) -> List[str]:
+        """
+        Fetch one batch of messages into results (keyed by message ID).
+        
+        Returns:
+            IDs that failed with a retryable error
+        """
+        retry = []
+        
+        def on_response(msg_id, message, exception):
+            if exception is None:
+                email_data = self._parse_message(message)
+                if email_data:
+                    results[msg_id] = email_data
+            elif isinstance(exception, HttpError) and exception.resp.status in RETRYABLE_STATUSES:
+                retry.append(msg_id)
+            else:
+                print(f"Error fetching message {msg_id}: {exception}")
+        
+        batch = self._new_batch(on_response)
+        for msg_id in message_ids:
+            batch.add(self._message_request(msg_id, self.fetch_format), request_id=msg_id)
+        try:
+            batch.execute()
+        except RefreshError:
+            raise
+        except Exception as e:
+            # The batch call itself failed (network, 5xx): retry whatever didn't come back
+            print(f"Error fetching message batch: {e}")
+            return [msg_id for msg_id in message_ids if msg_id not in results]
+        return retry
+    
+    def _invalidate_token(self):
+        """Remove a token that can no longer be refreshed and ask the user to reconnect."""
+        if os.path.exists(GMAIL_TOKEN_FILE):
+            try:
+                os.remove(GMAIL_TOKEN_FILE)
+            except OSError:
+                pass
+        raise Exception(
+            'invalid_grant: Your Gmail session expired or was revoked. Please reconnect your account.'
+        )
+    
+    def _message_request(self, msg_id: str, fetch_format: str):
+        """Build a messages.get request for the given format, trimmed with a fields mask."""
+        if fetch_format == 'metadata':
+            return self.service.users().messages().get(
+                userId='me', id=msg_id, format='metadata',
+                metadataHeaders=METADATA_HEADERS, fields=MESSAGE_FIELDS['metadata'])
+        return self.service.users().messages().get(
+            userId='me', id=msg_id, format='full', fields=MESSAGE_FIELDS['full'])
     
     def _get_message_details(self, msg_id: str) -> Optional[Dict]:
         """Get full details of a message."""
         try:
-            message = self.service.users().messages().get(
-                userId='me', id=msg_id, format='full').execute()
-            
+            message = self._message_request(msg_id, 'full').execute(num_retries=GMAIL_MAX_RETRIES)
+            return self._parse_message(message)
+        except Exception as e:
+            print(f"Error getting message details: {e}")
+            return None
+    
+    def get_message_body(self, msg_id: str) -> Optional[str]:
+        """
+        Download just the body of one message (for emails fetched in metadata mode).
+        
+        Only an existing token is used: this runs while serving a request, so
+        it never starts the browser consent flow.
+        
+        Returns:
+            The body (first 1000 chars), or None if it could not be downloaded
+        """
+        if not self.service:
+            if not self.authenticate(interactive=False):
+                return None
+        
+        email_data = self._get_message_details(msg_id)
+        return email_data['body'] if email_data else None
+    
+    def _parse_message(self, message: Dict) -> Optional[Dict]:
+        """Convert a Gmail API message resource into our email dict."""
+        try:
             headers = message['payload'].get('headers', [])
             
             # Extract headers
@@ -136,20 +402,21 @@ class GmailConnector:
             except:
                 date = datetime.now()
             
-            # Extract body
-            body = self._extract_body(message['payload'])
+            # Extract body (metadata responses have none; it is loaded on demand)
+            payload = message['payload']
+            body = self._extract_body(payload)[:1000] if 'mimeType' in payload else None
             
             return {
-                'id': msg_id,
+                'id': message['id'],
                 'subject': subject,
                 'sender': sender,
                 'date': date.isoformat(),
                 'snippet': message.get('snippet', ''),
-                'body': body[:1000],  # Limit body to first 1000 chars
+                'body': body,  # Limited to first 1000 chars
                 'thread_id': message.get('threadId', ''),
             }
         except Exception as e:
-            print(f"Error getting message details: {e}")
+            print(f"Error parsing message {message.get('id')}: {e}")
             return None
     
     def _extract_body(self, payload: Dict) -> str:
@@ -0,0 +1,131 @@
+import sys
+import os
+import threading
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+
+from typing import List, Dict, Iterator, Optional
+from google.auth.exceptions import RefreshError
+from googleapiclient.errors import HttpError
+from config.settings import EMAIL_FETCH_HOURS, EMAIL_FETCH_MAX, GMAIL_TOKEN_FILE
+from src.storage.database import Database
+from src.email_connectors.gmail import GmailConnector
+
+
+def sync_cursor_key(account: str, mailbox: str) -> str:
+    """sync_state key for a mailbox, e.g. 'gmail:me@example.com'."""
+    return f"{account}:{mailbox.lower()}"
+
+
+def iter_sync_pages(db: Database, gmail: GmailConnector, hours: int = EMAIL_FETCH_HOURS,
+                    account: str = 'gmail', max_messages: int = EMAIL_FETCH_MAX) -> Iterator[List[Dict]]:
+    """
+    Fetch new emails page by page, saving each page as it arrives.
+    
+    Resumes from the mailbox's last historyId when it is more recent than
+    the fetch window; otherwise lists the last N hours, newest first, up to
+    max_messages. Messages already stored locally are never downloaded again.
+    The historyId is saved per mailbox address, so connecting a different
+    Gmail account starts from a windowed list rather than another mailbox's
+    position. It only advances once every page has been listed and every
+    listed message downloaded, so an interrupted or partly failed sync is
+    picked up again from the previous point next time.
+    
+    Yields:
+        Lists of newly downloaded emails (already saved)
+    """
+    # Capture the history position before listing so nothing added meanwhile is missed
+    profile = gmail.get_profile()
+    if profile is None:
+        return
+    cursor_key = sync_cursor_key(account, profile['emailAddress'])
+    history_id = profile['historyId']
+    
+    start_history_id = db.get_sync_history_id(cursor_key, max_age_hours=hours)
+    pages = gmail.sync_message_id_pages(hours, start_history_id=start_history_id, max_messages=max_messages)
+    if pages is None:
+        return
+    
+    unavailable = 0
+    try:
+        for message_ids in pages:
+            known_ids = db.get_existing_email_ids(message_ids)
+            emails, failed = gmail.download_messages([msg_id for msg_id in message_ids if msg_id not in known_ids])
+            unavailable += len(failed)
+            db.save_emails(emails, account_type=account)
+            if emails:
+                yield emails
+    except RefreshError:
+        gmail._invalidate_token()
+    except HttpError as error:
+        print(f"An error occurred listing messages; the next sync resumes from the previous point: {error}")
+        return
+    
+    if unavailable:
+        print(f"{unavailable} messages could not be downloaded; the next sync resumes from the previous point")
+    else:
+        db.save_sync_history_id(cursor_key, history_id)
+
+
+def sync_emails(db: Database, gmail: GmailConnector, hours: int = EMAIL_FETCH_HOURS,
+                account: str = 'gmail', max_messages: int = EMAIL_FETCH_MAX) -> List[Dict]:
+    """
+    Fetch new emails and save them to the database.
+    
+    Returns:
+        The newly downloaded emails (see iter_sync_pages)
+    """
+    emails = []
+    for page in iter_sync_pages(db, gmail, hours, account, max_messages):
+        emails.extend(page)
+    return emails
+
+
+# One connector shared by all request threads for body downloads, so the Gmail
+# client is built once rather than on every email opened. API clients are not
+# thread-safe, so downloads through it take turns.
+_body_lock = threading.Lock()
+_body_gmail: Optional[GmailConnector] = None
+_body_token_stamp = None
+
+
+def _token_stamp() -> Optional[tuple]:
+    """Modification time and size of the token file (None if there is none)."""
+    try:
+        stat = os.stat(GMAIL_TOKEN_FILE)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def _download_body(email_id: str) -> Optional[str]:
+    """
+    Download a body through the shared connector.
+    
+    The connector is rebuilt when the token file changed since it was last
+    used (e.g. a different account was connected, or it was unlinked).
+    """
+    global _body_gmail, _body_token_stamp
+    with _body_lock:
+        if _body_gmail is None or _token_stamp() != _body_token_stamp:
+            _body_gmail = GmailConnector()
+        body = _body_gmail.get_message_body(email_id)
+        # Taken after the call, so the connector's own token refresh doesn't force a rebuild
+        _body_token_stamp = _token_stamp()
+        return body
+
+
+def get_email_with_body(db: Database, email_id: str, gmail: GmailConnector = None) -> Optional[Dict]:
+    """
+    Get a stored email, downloading its body first if it was fetched metadata-only.
+    
+    The body is saved, so each message body is downloaded at most once. If it
+    can't be downloaded (e.g. offline, or not signed in to Gmail), the email is
+    returned with body None and callers show the snippet.
+    """
+    email = db.get_email_by_id(email_id)
+    if email and email['body'] is None:
+        body = gmail.get_message_body(email_id) if gmail else _download_body(email_id)
+        if body is not None:
+            db.save_email_body(email_id, body)
+            email['body'] = body
+    return email
@@ -1,279 +1,516 @@
 import sqlite3
 import sys
 import os
+import time
+import hashlib
+import threading
+import numpy as np
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
 
+from contextlib import contextmanager
 from datetime import datetime
-from typing import List, Dict, Optional
-from config.settings import DATABASE_PATH
+from typing import List, Dict, Optional, Tuple, Iterable
+from src.utils.categories import classify_email
+from src.utils.senders import parse_sender, reputation_domain, normalize_sender_entry
+from src.storage.reputation import ReputationSnapshot
+from config.settings import (
+    DATABASE_PATH, EMBEDDING_CACHE_MAX_ENTRIES, BRIEF_CACHE_MAX_ENTRIES,
+    SQLITE_JOURNAL_MODE, SQLITE_SYNCHRONOUS, SQLITE_CACHE_SIZE, SQLITE_MMAP_SIZE,
+    SQLITE_TEMP_STORE, SQLITE_BUSY_TIMEOUT_MS,
+)
+
+
+def embedding_cache_key(model: str, text: str) -> str:
+    """Content address for an embedding: sha256 of the model name and input text."""
+    return hashlib.sha256(f"{model}\0{text}".encode('utf-8')).hexdigest()
+
+
+def email_timestamp(date: str) -> Optional[int]:
+    """UTC epoch seconds for a stored ISO date (naive dates are taken as local time)."""
+    try:
+        return int(datetime.fromisoformat(date).timestamp())
+    except (TypeError, ValueError):
+        return None
 
 
 class Database:
     """Local SQLite database for storing emails, embeddings, and feedback."""
     
+    # Connections are pooled per thread and per database file, so every
+    # Database() created on the same thread reuses one open connection.
+    _local = threading.local()
+    
+    # Database files whose schema has been brought up to date by this process
+    _migrated = set()
+    _migrate_lock = threading.Lock()
+    
+    # Cache hits not yet written to last_used: (db_path, table) -> {cache_key: time}.
+    # Read paths only record them here; the next save to that cache writes them
+    # before evicting, so lookups never take the write lock.
+    _lru_touches: Dict[Tuple[str, str], Dict[str, float]] = {}
+    _lru_lock = threading.Lock()
+    
+    # Reputation snapshots per database file (see get_reputation_snapshot)
+    _reputation: Dict[str, ReputationSnapshot] = {}
+    _reputation_lock = threading.Lock()
+    
     def __init__(self, db_path: str = DATABASE_PATH):
         self.db_path = db_path
         self._init_db()
     
+    def _state(self) -> Dict:
+        """Get (or open) this thread's connection state for db_path."""
+        pool = getattr(self._local, 'pool', None)
+        if pool is None:
+            pool = self._local.pool = {}
+        state = pool.get(self.db_path)
+        if state is None:
+            # Autocommit mode: transactions are managed explicitly in transaction()
+            conn = sqlite3.connect(self.db_path, isolation_level=None,
+                                   timeout=SQLITE_BUSY_TIMEOUT_MS / 1000)
+            self._configure(conn)
+            state = pool[self.db_path] = {'conn': conn, 'depth': 0, 'on_commit': []}
+        return state
+    
+    @staticmethod
+    def _configure(conn: sqlite3.Connection):
+        """Apply the SQLITE_* settings so the web UI and CLI can share the file."""
+        conn.execute(f'PRAGMA busy_timeout = {int(SQLITE_BUSY_TIMEOUT_MS)}')
+        conn.execute(f'PRAGMA journal_mode = {SQLITE_JOURNAL_MODE}')
+        conn.execute(f'PRAGMA synchronous = {SQLITE_SYNCHRONOUS}')
+        conn.execute(f'PRAGMA cache_size = {int(SQLITE_CACHE_SIZE)}')
+        conn.execute(f'PRAGMA mmap_size = {int(SQLITE_MMAP_SIZE)}')
+        conn.execute(f'PRAGMA temp_store = {SQLITE_TEMP_STORE}')
+    
+    def _connect(self) -> sqlite3.Connection:
+        """Get this thread's pooled connection."""
+        return self._state()['conn']
+    
+    @contextmanager
+    def transaction(self):
+        """
+        Unit of work: everything inside the block commits once on exit.
+        
+        Blocks nest (inner ones become savepoints), so the per-method writes
+        below join an enclosing ``with db.transaction():`` instead of each
+        committing on their own. Any exception rolls the block back.
+        
+        The outermost block takes the write lock up front (BEGIN IMMEDIATE),
+        so a concurrent writer waits out busy_timeout instead of failing with
+        "database is locked" when a read transaction tries to upgrade.
+        """
+        state = self._state()
+        conn = state['conn']
+        depth = state['depth']
+        pending = len(state['on_commit'])
+        savepoint = f'sp_{depth}'
+        conn.execute('BEGIN IMMEDIATE' if depth == 0 else f'SAVEPOINT {savepoint}')
+        state['depth'] = depth + 1
+        try:
+            yield conn
+        except BaseException:
+            state['depth'] = depth
+            del state['on_commit'][pending:]
+            if depth == 0:
+                conn.execute('ROLLBACK')
+            else:
+                conn.execute(f'ROLLBACK TO {savepoint}')
+                conn.execute(f'RELEASE {savepoint}')
+            raise
+        else:
+            state['depth'] = depth
+            conn.execute('COMMIT' if depth == 0 else f'RELEASE {savepoint}')
+            if depth == 0:
+                callbacks, state['on_commit'] = state['on_commit'], []
+                for callback in callbacks:
+                    callback()
+    
+    def _after_commit(self, callback):
+        """Run callback once the enclosing transaction commits (dropped on rollback)."""
+        self._state()['on_commit'].append(callback)
+    
+    def close(self):
+        """Close this thread's pooled connection (reopened on next use)."""
+        pool = getattr(self._local, 'pool', None)
+        if pool and self.db_path in pool:
+            pool.pop(self.db_path)['conn'].close()
+    
     def _init_db(self):
-        """Initialize database schema."""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        # Emails table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS emails (
-                id TEXT PRIMARY KEY,
-                subject TEXT,
-                sender TEXT,
-                date TEXT,
-                snippet TEXT,
-                body TEXT,
-                thread_id TEXT,
-                account_type TEXT,
-                importance_score REAL DEFAULT 0.0,
-                created_at TEXT DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        
-        # Embeddings table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS embeddings (
-                email_id TEXT PRIMARY KEY,
-                embedding TEXT,
-                created_at TEXT DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (email_id) REFERENCES emails(id)
-            )
-        ''')
-        
-        # Feedback table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS feedback (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                email_id TEXT,
-                is_important INTEGER,
-                created_at TEXT DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (email_id) REFERENCES emails(id)
-            )
-        ''')
-        
-        # Sender patterns table (for learning)
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS sender_patterns (
-                sender TEXT PRIMARY KEY,
-                important_count INTEGER DEFAULT 0,
-                not_important_count INTEGER DEFAULT 0,
-                last_updated TEXT DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        
-        # User preferences table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS user_preferences (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                key TEXT UNIQUE,
-                value TEXT,
-                updated_at TEXT DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        
-        # Enhanced feedback table with categories and priorities
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS feedback_enhanced (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                email_id TEXT,
-                is_important INTEGER,
-                priority TEXT,
-                category TEXT,
-                notes TEXT,
-                created_at TEXT DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (email_id) REFERENCES emails(id)
-            )
-        ''')
-        
-        # Email categories table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS email_categories (
-                email_id TEXT PRIMARY KEY,
-                category TEXT,
-                confidence REAL,
-                created_at TEXT DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (email_id) REFERENCES emails(id)
-            )
-        ''')
-        
-        # Brief delivery history
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS brief_deliveries (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                brief_text TEXT,
-                delivery_method TEXT,
-                delivery_status TEXT,
-                created_at TEXT DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        
-        # Important senders (user-defined)
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS important_senders (
-                sender TEXT PRIMARY KEY,
-                priority TEXT,
-                category TEXT,
-                notes TEXT,
-                created_at TEXT DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        
-        # Category patterns (learn from feedback: e.g. "Promotions" often not important)
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS category_patterns (
-                category TEXT PRIMARY KEY,
-                important_count INTEGER DEFAULT 0,
-                not_important_count INTEGER DEFAULT 0,
-                last_updated TEXT DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        
-        # Archived in our system only (user confirmed non-priority; we never write to Gmail)
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS email_archived (
-                email_id TEXT PRIMARY KEY,
-                archived_at TEXT DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (email_id) REFERENCES emails(id)
-            )
-        ''')
-        
-        conn.commit()
-        conn.close()
+        """Bring the schema up to date (once per process and database file)."""
+        if self.db_path in self._migrated:
+            return
+        with self._migrate_lock:
+            if self.db_path not in self._migrated:
+                from src.storage.migrations import migrate
+                migrate(self)
+                self._migrated.add(self.db_path)
+    
+    @staticmethod
+    def _encode_embedding(embedding) -> bytes:
+        """Pack an embedding as little-endian float32 bytes (4 bytes per dimension)."""
+        return np.asarray(embedding, dtype='<f4').tobytes()
+    
+    @staticmethod
+    def _decode_embedding(value) -> np.ndarray:
+        """Decode a stored embedding (float32 BLOB, or legacy comma-separated TEXT)."""
+        if isinstance(value, str):
+            return np.array(value.split(','), dtype=np.float32)
+        return np.frombuffer(value, dtype='<f4')
     
     def save_email(self, email: Dict, account_type: str = 'gmail'):
-        """Save or update an email."""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            INSERT OR REPLACE INTO emails 
-            (id, subject, sender, date, snippet, body, thread_id, account_type)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (
+        """Save or update an email (see save_emails)."""
+        self.save_emails([email], account_type)
+    
+    def save_emails(self, emails: Iterable[Dict], account_type: str = 'gmail') -> int:
+        """
+        Save or update many emails in one transaction.
+        
+        Existing rows are updated in place, so importance_score and other
+        local state survive a re-fetch. A missing/None body (metadata-only
+        fetch) is stored as NULL and never overwrites a body that was already
+        downloaded. Each email's category and normalized sender address and
+        domain are computed here, once, and stored with it.
+        
+        Returns:
+            Number of emails written
+        """
+        rows = [(
             email['id'],
             email['subject'],
             email['sender'],
             email['date'],
             email.get('snippet', ''),
-            email.get('body', ''),
+            email.get('body'),
             email.get('thread_id', ''),
-            account_type
-        ))
-        
-        conn.commit()
-        conn.close()
+            account_type,
+            email_timestamp(email['date']),
+            *parse_sender(email['sender'])
+        ) for email in emails]
+        if not rows:
+            return 0
+        with self.transaction() as conn:
+            conn.executemany('''
+                INSERT INTO emails 
+                (id, subject, sender, date, snippet, body, thread_id, account_type, date_ts,
+                 sender_address, sender_domain)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(id) DO UPDATE SET
+                    subject = excluded.subject,
+                    sender = excluded.sender,
+                    date = excluded.date,
+                    snippet = excluded.snippet,
+                    body = COALESCE(excluded.body, emails.body),
+                    thread_id = excluded.thread_id,
+                    account_type = excluded.account_type,
+                    date_ts = excluded.date_ts,
+                    sender_address = excluded.sender_address,
+                    sender_domain = excluded.sender_domain
+            ''', rows)
+            conn.executemany('''
+                INSERT OR REPLACE INTO email_categories (email_id, category, confidence)
+                VALUES (?, ?, ?)
+            ''', [(row[0], *classify_email(row[2], row[1])) for row in rows])
+        return len(rows)
     
-    def save_embedding(self, email_id: str, embedding: List[float]):
-        """Save embedding for an email."""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        embedding_str = ','.join(map(str, embedding))
-        
-        cursor.execute('''
-            INSERT OR REPLACE INTO embeddings (email_id, embedding)
-            VALUES (?, ?)
-        ''', (email_id, embedding_str))
-        
-        conn.commit()
-        conn.close()
+    def save_email_body(self, email_id: str, body: str):
+        """Store the body of an email that was fetched metadata-only."""
+        with self.transaction() as conn:
+            conn.execute('UPDATE emails SET body = ? WHERE id = ?', (body, email_id))
     
-    def get_embedding(self, email_id: str) -> Optional[List[float]]:
-        """Get embedding for an email."""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
+    def get_existing_email_ids(self, email_ids: List[str]) -> set:
+        """Return the subset of email_ids already stored locally."""
+        existing = set()
+        cursor = self._connect().cursor()
+        for start in range(0, len(email_ids), 500):
+            chunk = email_ids[start:start + 500]
+            placeholders = ','.join('?' * len(chunk))
+            cursor.execute(f'SELECT id FROM emails WHERE id IN ({placeholders})', chunk)
+            existing.update(row[0] for row in cursor.fetchall())
+        return existing
+    
+    def get_sync_history_id(self, account: str, max_age_hours: int = None) -> Optional[str]:
+        """Last synced historyId for an account (None if never synced or older than max_age_hours)."""
+        cursor = self._connect().cursor()
+        if max_age_hours is None:
+            cursor.execute('SELECT history_id FROM sync_state WHERE account = ?', (account,))
+        else:
+            cursor.execute('''
+                SELECT history_id FROM sync_state
+                WHERE account = ? AND updated_at >= datetime('now', '-' || ? || ' hours')
+            ''', (account, max_age_hours))
+        result = cursor.fetchone()
+        return result[0] if result else None
+    
+    def save_sync_history_id(self, account: str, history_id: str):
+        """Record where the next incremental sync for an account should resume."""
+        with self.transaction() as conn:
+            conn.execute('''
+                INSERT OR REPLACE INTO sync_state (account, history_id, updated_at)
+                VALUES (?, ?, CURRENT_TIMESTAMP)
+            ''', (account, history_id))
+    
+    def save_embedding(self, email_id: str, embedding):
+        """Save embedding for an email (stored as a packed float32 BLOB)."""
+        with self.transaction() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                INSERT OR REPLACE INTO embeddings (email_id, embedding)
+                VALUES (?, ?)
+            ''', (email_id, self._encode_embedding(embedding)))
+    
+    def get_embedding(self, email_id: str) -> Optional[np.ndarray]:
+        """Get embedding for an email as a read-only float32 vector."""
+        cursor = self._connect().cursor()
         cursor.execute('SELECT embedding FROM embeddings WHERE email_id = ?', (email_id,))
         result = cursor.fetchone()
-        conn.close()
         
         if result:
-            return [float(x) for x in result[0].split(',')]
+            return self._decode_embedding(result[0])
         return None
     
-    def get_important_emails_embeddings(self) -> List[tuple]:
-        """Get embeddings of emails marked as important."""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
+    def get_cached_embeddings(self, cache_keys: List[str]) -> Dict[str, np.ndarray]:
+        """Look up embeddings by content key, marking hits as recently used."""
+        found = {}
+        cursor = self._connect().cursor()
+        for start in range(0, len(cache_keys), 500):
+            chunk = cache_keys[start:start + 500]
+            placeholders = ','.join('?' * len(chunk))
+            cursor.execute(
+                f'SELECT cache_key, embedding FROM embedding_cache WHERE cache_key IN ({placeholders})', chunk)
+            for cache_key, value in cursor.fetchall():
+                found[cache_key] = self._decode_embedding(value)
+        
+        self._touch_cached('embedding_cache', found)
+        return found
+    
+    def _touch_cached(self, table: str, cache_keys: Iterable[str]):
+        """Mark cache hits as used now (written by the next _flush_touches for table)."""
+        now = time.time()
+        with self._lru_lock:
+            touched = self._lru_touches.setdefault((self.db_path, table), {})
+            for cache_key in cache_keys:
+                touched[cache_key] = now
+    
+    def _flush_touches(self, conn: sqlite3.Connection, table: str):
+        """Write pending cache hits for table to last_used (inside the caller's transaction)."""
+        with self._lru_lock:
+            touched = self._lru_touches.pop((self.db_path, table), None)
+        if touched:
+            conn.executemany(f'UPDATE {table} SET last_used = ? WHERE cache_key = ? AND last_used < ?',
+                             [(used, cache_key, used) for cache_key, used in touched.items()])
+    
+    def save_cached_embeddings(self, embeddings: Dict[str, np.ndarray],
+                               max_entries: int = EMBEDDING_CACHE_MAX_ENTRIES):
+        """Store embeddings by content key, evicting least recently used beyond max_entries."""
+        if not embeddings:
+            return
+        now = time.time()
+        with self.transaction() as conn:
+            self._flush_touches(conn, 'embedding_cache')
+            conn.executemany(
+                'INSERT OR REPLACE INTO embedding_cache (cache_key, embedding, last_used) VALUES (?, ?, ?)',
+                [(cache_key, self._encode_embedding(embedding), now)
+                 for cache_key, embedding in embeddings.items()]
+            )
+            conn.execute('''
+                DELETE FROM embedding_cache WHERE cache_key IN (
+                    SELECT cache_key FROM embedding_cache ORDER BY last_used DESC LIMIT -1 OFFSET ?
+                )
+            ''', (max_entries,))
+    
+    def get_important_embeddings(self) -> Tuple[List[str], np.ndarray]:
+        """
+        Get embeddings of emails marked as important.
+        
+        Returns:
+            (email_ids, matrix) where matrix is a contiguous float32 array of
+            shape (len(email_ids), dim); row i belongs to email_ids[i].
+        """
+        cursor = self._connect().cursor()
         cursor.execute('''
-            SELECT e.email_id, e.embedding
-            FROM embeddings e
-            JOIN feedback f ON e.email_id = f.email_id
-            WHERE f.is_important = 1
+            SELECT email_id, embedding
+            FROM embeddings
+            WHERE email_id IN (SELECT email_id FROM feedback WHERE is_important = 1)
         ''')
-        
         results = cursor.fetchall()
-        conn.close()
         
-        embeddings = []
-        for email_id, embedding_str in results:
-            embedding = [float(x) for x in embedding_str.split(',')]
-            embeddings.append((email_id, embedding))
+        if not results:
+            return [], np.empty((0, 0), dtype=np.float32)
         
-        return embeddings
+        email_ids = [row[0] for row in results]
+        if all(isinstance(row[1], bytes) for row in results):
+            matrix = np.frombuffer(b''.join(row[1] for row in results), dtype='<f4')
+            return email_ids, matrix.reshape(len(results), -1)
+        return email_ids, np.vstack([self._decode_embedding(row[1]) for row in results])
+    
+    def get_data_version(self) -> int:
+        """
+        Counter bumped (by triggers) on any change to emails, scores, feedback,
+        archive state or category patterns; cache views against it.
+        """
+        cursor = self._connect().cursor()
+        cursor.execute('SELECT version FROM data_version WHERE id = 1')
+        return cursor.fetchone()[0]
+    
+    def get_feedback_version(self) -> Tuple:
+        """
+        Cheap fingerprint of the feedback state used for similarity scoring.
+        
+        Changes whenever feedback is added or removed, or an email marked
+        important gets (or loses) an embedding.
+        """
+        cursor = self._connect().cursor()
+        cursor.execute('''
+            SELECT
+                (SELECT MAX(id) FROM feedback),
+                (SELECT COUNT(*) FROM feedback),
+                (SELECT COUNT(*) FROM embeddings
+                 WHERE email_id IN (SELECT email_id FROM feedback WHERE is_important = 1))
+        ''')
+        return cursor.fetchone()
     
     def save_feedback(self, email_id: str, is_important: bool):
         """Save user feedback for an email."""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            INSERT INTO feedback (email_id, is_important)
-            VALUES (?, ?)
-        ''', (email_id, 1 if is_important else 0))
-        
-        # Update sender pattern
-        cursor.execute('SELECT sender FROM emails WHERE id = ?', (email_id,))
+        with self.transaction() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                INSERT INTO feedback (email_id, is_important)
+                VALUES (?, ?)
+            ''', (email_id, 1 if is_important else 0))
+            
+            # Update sender pattern
+            self._update_sender_pattern(cursor, email_id, is_important)
+    
+    def _update_sender_pattern(self, cursor: sqlite3.Cursor, email_id: str, is_important: bool):
+        """Bump the important/not-important counters of the email's sender address and domain."""
+        cursor.execute('SELECT sender, sender_address, sender_domain FROM emails WHERE id = ?', (email_id,))
         result = cursor.fetchone()
         if result:
-            sender = result[0]
+            address, domain = result[1:] if result[1] is not None else parse_sender(result[0])
+            self._bump_pattern(cursor, 'sender_patterns', 'sender', 'sender', address, is_important)
+            domain = reputation_domain(domain)
+            if domain:
+                self._bump_pattern(cursor, 'domain_patterns', 'domain', 'domain', domain, is_important)
+    
+    def _bump_pattern(self, cursor: sqlite3.Cursor, table: str, column: str, kind: str,
+                      name: str, is_important: bool):
+        """Add one feedback to name's row in a *_patterns table (and to the snapshot on commit)."""
+        cursor.execute(f'''
+            INSERT INTO {table} ({column}, important_count, not_important_count, last_updated)
+            VALUES (?, ?, ?, CURRENT_TIMESTAMP)
+            ON CONFLICT({column}) DO UPDATE SET
+                important_count = important_count + excluded.important_count,
+                not_important_count = not_important_count + excluded.not_important_count,
+                last_updated = excluded.last_updated
+        ''', (name, 1 if is_important else 0, 0 if is_important else 1))
+        self._after_commit(lambda: self._record_reputation(kind, name, is_important))
+    
+    def get_reputation_snapshot(self) -> ReputationSnapshot:
+        """
+        All sender, domain and category reputations and the important senders
+        in memory (shared per database file).
+        
+        Reloaded only if another process changed feedback since it was taken;
+        writes from this process update it in place when they commit. Inside
+        an open transaction the rows may include writes that are not yet
+        committed, so a reload there is returned without being shared (those
+        writes reach the shared snapshot once, on commit).
+        """
+        version = self._reputation_version()
+        snapshot = self._reputation.get(self.db_path)
+        if snapshot is not None and snapshot.version == version:
+            return snapshot
+        with self._reputation_lock:
+            snapshot = self._load_reputation(version)
+            if self._state()['depth'] == 0:
+                self._reputation[self.db_path] = snapshot
+            return snapshot
+    
+    def _load_reputation(self, version: Tuple) -> ReputationSnapshot:
+        """Read the *_patterns tables and important_senders into a new snapshot."""
+        cursor = self._connect().cursor()
+        cursor.execute('SELECT sender, important_count, not_important_count FROM sender_patterns')
+        senders = {row[0]: [row[1], row[2]] for row in cursor.fetchall()}
+        cursor.execute('SELECT domain, important_count, not_important_count FROM domain_patterns')
+        domains = {row[0]: [row[1], row[2]] for row in cursor.fetchall()}
+        cursor.execute('SELECT category, important_count, not_important_count FROM category_patterns')
+        categories = {row[0]: [row[1], row[2]] for row in cursor.fetchall()}
+        cursor.execute('SELECT sender, priority FROM important_senders')
+        important_senders = dict(cursor.fetchall())
+        return ReputationSnapshot(senders, domains, categories, important_senders, version)
+    
+    def _reputation_version(self) -> Tuple:
+        """Cheap fingerprint of the *_patterns tables and important_senders."""
+        cursor = self._connect().cursor()
+        cursor.execute('''
+            SELECT
+                (SELECT MAX(id) FROM feedback),
+                (SELECT COUNT(*) FROM feedback),
+                (SELECT TOTAL(important_count + not_important_count) FROM sender_patterns),
+                (SELECT TOTAL(important_count + not_important_count) FROM domain_patterns),
+                (SELECT TOTAL(important_count + not_important_count) FROM category_patterns),
+                (SELECT COUNT(*) FROM important_senders),
+                (SELECT MAX(rowid) FROM important_senders)
+        ''')
+        return cursor.fetchone()
+    
+    def _record_reputation(self, kind: str, name: str, is_important: bool):
+        """Apply a committed feedback write to the loaded snapshot, if any."""
+        with self._reputation_lock:
+            snapshot = self._reputation.get(self.db_path)
+            if snapshot is not None:
+                snapshot._record(kind, name, is_important)
+                snapshot.version = self._reputation_version()
+    
+    def get_feedback_count(self) -> int:
+        """Number of feedback entries recorded (used to decide if training is done)."""
+        cursor = self._connect().cursor()
+        cursor.execute('SELECT COUNT(*) FROM feedback')
+        return cursor.fetchone()[0]
+    
+    def get_feedback_map(self) -> Dict[str, int]:
+        """Latest feedback value (1/0) per email_id."""
+        cursor = self._connect().cursor()
+        cursor.execute('SELECT email_id, is_important FROM feedback ORDER BY id DESC')
+        feedback_map = {}
+        for email_id, is_important in cursor.fetchall():
+            if email_id not in feedback_map:
+                feedback_map[email_id] = is_important
+        return feedback_map
+    
+    def reset_training(self):
+        """Clear all feedback and learned sender patterns."""
+        with self.transaction() as conn:
+            cursor = conn.cursor()
+            cursor.execute('DELETE FROM feedback')
+            cursor.execute('DELETE FROM feedback_enhanced')
+            cursor.execute('DELETE FROM sender_patterns')
+            cursor.execute('DELETE FROM domain_patterns')
+            self._after_commit(lambda: self._reputation.pop(self.db_path, None))
+    
+    def update_category_feedback(self, category: str, is_important: bool):
+        """Update category pattern from feedback (e.g. mark Promotions as not important)."""
+        with self.transaction() as conn:
+            cursor = conn.cursor()
             cursor.execute('''
-                INSERT OR REPLACE INTO sender_patterns 
-                (sender, important_count, not_important_count, last_updated)
+                INSERT OR REPLACE INTO category_patterns
+                (category, important_count, not_important_count, last_updated)
                 VALUES (
                     ?,
-                    COALESCE((SELECT important_count FROM sender_patterns WHERE sender = ?), 0) + ?,
-                    COALESCE((SELECT not_important_count FROM sender_patterns WHERE sender = ?), 0) + ?,
+                    COALESCE((SELECT important_count FROM category_patterns WHERE category = ?), 0) + ?,
+                    COALESCE((SELECT not_important_count FROM category_patterns WHERE category = ?), 0) + ?,
                     CURRENT_TIMESTAMP
                 )
-            ''', (sender, sender, 1 if is_important else 0, sender, 0 if is_important else 1))
-        
-        conn.commit()
-        conn.close()
-    
-    def update_category_feedback(self, category: str, is_important: bool):
-        """Update category pattern from feedback (e.g. mark Promotions as not important)."""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        cursor.execute('''
-            INSERT OR REPLACE INTO category_patterns
-            (category, important_count, not_important_count, last_updated)
-            VALUES (
-                ?,
-                COALESCE((SELECT important_count FROM category_patterns WHERE category = ?), 0) + ?,
-                COALESCE((SELECT not_important_count FROM category_patterns WHERE category = ?), 0) + ?,
-                CURRENT_TIMESTAMP
-            )
-        ''', (category, category, 1 if is_important else 0, category, 0 if is_important else 1))
-        conn.commit()
-        conn.close()
+            ''', (category, category, 1 if is_important else 0, category, 0 if is_important else 1))
+            self._after_commit(lambda: self._record_reputation('category', category, is_important))
     
     def get_category_reputation(self, category: str) -> float:
         """Get category reputation (0-1) from feedback history."""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        cursor = self._connect().cursor()
         cursor.execute('''
             SELECT important_count, not_important_count FROM category_patterns WHERE category = ?
         ''', (category,))
         result = cursor.fetchone()
-        conn.close()
         if not result:
             return 0.5
         important, not_important = result
@@ -282,78 +519,55 @@ class Database:
             return 0.5
         return important / total
     
-    def get_email_by_id(self, email_id: str) -> Optional[Dict]:
-        """Get a single email by ID."""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        cursor.execute('''
-            SELECT id, subject, sender, date, snippet, body, importance_score
-            FROM emails WHERE id = ?
-        ''', (email_id,))
-        row = cursor.fetchone()
-        conn.close()
-        if not row:
-            return None
-        return {
-            'id': row[0], 'subject': row[1], 'sender': row[2], 'date': row[3],
-            'snippet': row[4], 'body': row[5], 'importance_score': row[6]
-        }
-    
     def get_archived_ids(self) -> set:
         """Return set of email_ids that user has archived in our system (we never touch Gmail)."""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        cursor = self._connect().cursor()
         cursor.execute('SELECT email_id FROM email_archived')
-        ids = {row[0] for row in cursor.fetchall()}
-        conn.close()
-        return ids
+        return {row[0] for row in cursor.fetchall()}
     
     def archive_email(self, email_id: str):
         """Mark email as archived in our system only (no Gmail write)."""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        cursor.execute('INSERT OR IGNORE INTO email_archived (email_id) VALUES (?)', (email_id,))
-        conn.commit()
-        conn.close()
+        with self.transaction() as conn:
+            conn.execute('INSERT OR IGNORE INTO email_archived (email_id) VALUES (?)', (email_id,))
     
     def archive_emails(self, email_ids: List[str]):
         """Mark multiple emails as archived in our system only."""
         if not email_ids:
             return
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        for eid in email_ids:
-            cursor.execute('INSERT OR IGNORE INTO email_archived (email_id) VALUES (?)', (eid,))
-        conn.commit()
-        conn.close()
+        with self.transaction() as conn:
+            conn.executemany('INSERT OR IGNORE INTO email_archived (email_id) VALUES (?)',
+                             [(eid,) for eid in email_ids])
     
     def update_importance_score(self, email_id: str, score: float):
         """Update importance score for an email."""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            UPDATE emails SET importance_score = ? WHERE id = ?
-        ''', (score, email_id))
-        
-        conn.commit()
-        conn.close()
+        with self.transaction() as conn:
+            conn.execute('''
+                UPDATE emails SET importance_score = ? WHERE id = ?
+            ''', (score, email_id))
+    
+    def update_importance_scores(self, scores: Dict[str, float]):
+        """Update importance scores for many emails in one statement."""
+        with self.transaction() as conn:
+            conn.executemany(
+                'UPDATE emails SET importance_score = ? WHERE id = ?',
+                [(score, email_id) for email_id, score in scores.items()]
+            )
     
     def get_recent_emails(self, hours: int = 48) -> List[Dict]:
-        """Get emails from the last N hours."""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cutoff = datetime.now().isoformat()
+        """Get emails from the last N hours (an index range scan on date_ts)."""
+        cutoff = int(time.time()) - int(hours) * 3600
+        cursor = self._connect().cursor()
+        # Pin the range scan; otherwise the planner may walk idx_emails_score_date
+        # over the whole table just to avoid sorting the (small) window
         cursor.execute('''
-            SELECT id, subject, sender, date, snippet, body, importance_score
-            FROM emails
-            WHERE datetime(date) >= datetime('now', '-' || ? || ' hours')
-            ORDER BY importance_score DESC, date DESC
-        ''', (hours,))
-        
+            SELECT e.id, e.subject, e.sender, e.date, e.snippet, e.body, e.importance_score, c.category,
+                   e.sender_address, e.sender_domain
+            FROM emails AS e INDEXED BY idx_emails_date_ts
+            LEFT JOIN email_categories c ON c.email_id = e.id
+            WHERE e.date_ts >= ?
+            ORDER BY e.importance_score DESC, e.date_ts DESC
+        ''', (cutoff,))
         rows = cursor.fetchall()
-        conn.close()
         
         emails = []
         for row in rows:
@@ -364,24 +578,34 @@ class Database:
                 'date': row[3],
                 'snippet': row[4],
                 'body': row[5],
-                'importance_score': row[6]
+                'importance_score': row[6],
+                'category': row[7],
+                'sender_address': row[8],
+                'sender_domain': row[9]
             })
         
         return emails
     
     def get_sender_reputation(self, sender: str) -> float:
-        """Get sender reputation score based on feedback history."""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
+        """
+        Get sender reputation score based on feedback history.
+        
+        Looks up the sender's normalized address, falling back to its domain
+        when the address has no feedback yet.
+        """
+        address, domain = parse_sender(sender)
+        cursor = self._connect().cursor()
         cursor.execute('''
             SELECT important_count, not_important_count
             FROM sender_patterns
-            WHERE sender = ?
-        ''', (sender,))
-        
+            WHERE sender = ? AND important_count + not_important_count > 0
+            UNION ALL
+            SELECT important_count, not_important_count
+            FROM domain_patterns
+            WHERE domain = ?
+            LIMIT 1
+        ''', (address, reputation_domain(domain)))
         result = cursor.fetchone()
-        conn.close()
         
         if not result:
             return 0.5  # Neutral
@@ -396,84 +620,55 @@ class Database:
     
     def save_user_preference(self, key: str, value: str):
         """Save user preference."""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            INSERT OR REPLACE INTO user_preferences (key, value, updated_at)
-            VALUES (?, ?, CURRENT_TIMESTAMP)
-        ''', (key, value))
-        
-        conn.commit()
-        conn.close()
+        with self.transaction() as conn:
+            conn.execute('''
+                INSERT OR REPLACE INTO user_preferences (key, value, updated_at)
+                VALUES (?, ?, CURRENT_TIMESTAMP)
+            ''', (key, value))
     
     def get_user_preference(self, key: str, default: str = None) -> Optional[str]:
         """Get user preference."""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
+        cursor = self._connect().cursor()
         cursor.execute('SELECT value FROM user_preferences WHERE key = ?', (key,))
         result = cursor.fetchone()
-        conn.close()
         
         return result[0] if result else default
     
     def save_enhanced_feedback(self, email_id: str, is_important: bool, 
                               priority: str = None, category: str = None, notes: str = None):
         """Save enhanced feedback with priority and category."""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        # Save to enhanced feedback table
-        cursor.execute('''
-            INSERT INTO feedback_enhanced (email_id, is_important, priority, category, notes)
-            VALUES (?, ?, ?, ?, ?)
-        ''', (email_id, 1 if is_important else 0, priority, category, notes))
-        
-        # Also save to regular feedback for backward compatibility
-        self.save_feedback(email_id, is_important)
-        
-        # Update sender pattern
-        cursor.execute('SELECT sender FROM emails WHERE id = ?', (email_id,))
-        result = cursor.fetchone()
-        if result:
-            sender = result[0]
+        with self.transaction() as conn:
+            cursor = conn.cursor()
+            
+            # Save to enhanced feedback table
             cursor.execute('''
-                INSERT OR REPLACE INTO sender_patterns 
-                (sender, important_count, not_important_count, last_updated)
-                VALUES (
-                    ?,
-                    COALESCE((SELECT important_count FROM sender_patterns WHERE sender = ?), 0) + ?,
-                    COALESCE((SELECT not_important_count FROM sender_patterns WHERE sender = ?), 0) + ?,
-                    CURRENT_TIMESTAMP
-                )
-            ''', (sender, sender, 1 if is_important else 0, sender, 0 if is_important else 1))
-        
-        conn.commit()
-        conn.close()
+                INSERT INTO feedback_enhanced (email_id, is_important, priority, category, notes)
+                VALUES (?, ?, ?, ?, ?)
+            ''', (email_id, 1 if is_important else 0, priority, category, notes))
+            
+            # Also save to regular feedback for backward compatibility (this updates the sender pattern)
+            self.save_feedback(email_id, is_important)
     
     def save_important_sender(self, sender: str, priority: str = 'high', 
                              category: str = None, notes: str = None):
-        """Save important sender configuration."""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            INSERT OR REPLACE INTO important_senders (sender, priority, category, notes, created_at)
-            VALUES (?, ?, ?, ?, CURRENT_TIMESTAMP)
-        ''', (sender, priority, category, notes))
-        
-        conn.commit()
-        conn.close()
+        """
+        Save important sender configuration.
+        
+        sender may be an address or a domain ('company.com', '*@company.com');
+        it is stored normalized so scoring can match it exactly.
+        """
+        with self.transaction() as conn:
+            conn.execute('''
+                INSERT OR REPLACE INTO important_senders (sender, priority, category, notes, created_at)
+                VALUES (?, ?, ?, ?, CURRENT_TIMESTAMP)
+            ''', (normalize_sender_entry(sender), priority, category, notes))
+            self._after_commit(lambda: self._reputation.pop(self.db_path, None))
     
     def get_important_senders(self) -> List[Dict]:
         """Get list of important senders."""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
+        cursor = self._connect().cursor()
         cursor.execute('SELECT sender, priority, category, notes FROM important_senders')
         rows = cursor.fetchall()
-        conn.close()
         
         return [{
             'sender': row[0],
@@ -485,29 +680,83 @@ class Database:
     def save_brief_delivery(self, brief_text: str, delivery_method: str, 
                             delivery_status: str = 'sent'):
         """Save brief delivery record."""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            INSERT INTO brief_deliveries (brief_text, delivery_method, delivery_status)
-            VALUES (?, ?, ?)
-        ''', (brief_text, delivery_method, delivery_status))
-        
-        conn.commit()
-        conn.close()
+        with self.transaction() as conn:
+            conn.execute('''
+                INSERT INTO brief_deliveries (brief_text, delivery_method, delivery_status)
+                VALUES (?, ?, ?)
+            ''', (brief_text, delivery_method, delivery_status))
+    
+    def get_cached_brief(self, cache_key: str) -> Optional[str]:
+        """Look up a generated brief by BriefSummarizer.brief_cache_key, marking it recently used."""
+        cursor = self._connect().cursor()
+        cursor.execute('SELECT brief_text FROM brief_cache WHERE cache_key = ?', (cache_key,))
+        result = cursor.fetchone()
+        if not result:
+            return None
+        self._touch_cached('brief_cache', [cache_key])
+        return result[0]
+    
+    def save_cached_brief(self, cache_key: str, brief_text: str, model: str,
+                          max_entries: int = BRIEF_CACHE_MAX_ENTRIES):
+        """Store a generated brief, evicting least recently used beyond max_entries."""
+        now = time.time()
+        with self.transaction() as conn:
+            self._flush_touches(conn, 'brief_cache')
+            conn.execute('''
+                INSERT OR REPLACE INTO brief_cache (cache_key, brief_text, model, created_at, last_used)
+                VALUES (?, ?, ?, ?, ?)
+            ''', (cache_key, brief_text, model, now, now))
+            conn.execute('''
+                DELETE FROM brief_cache WHERE cache_key IN (
+                    SELECT cache_key FROM brief_cache ORDER BY last_used DESC LIMIT -1 OFFSET ?
+                )
+            ''', (max_entries,))
+    
+    def get_email_summaries(self, content_hashes: Dict[str, str]) -> Dict[str, str]:
+        """
+        Stored one-sentence summaries for emails.
+        
+        Args:
+            content_hashes: email id -> BriefSummarizer.summary_hash of the email
+        
+        Returns:
+            email id -> summary, for emails whose stored hash still matches
+        """
+        found = {}
+        email_ids = list(content_hashes)
+        cursor = self._connect().cursor()
+        for start in range(0, len(email_ids), 500):
+            chunk = email_ids[start:start + 500]
+            placeholders = ','.join('?' * len(chunk))
+            cursor.execute(
+                f'SELECT email_id, content_hash, summary FROM email_summaries WHERE email_id IN ({placeholders})', chunk)
+            for email_id, content_hash, summary in cursor.fetchall():
+                if content_hash == content_hashes[email_id]:
+                    found[email_id] = summary
+        return found
+    
+    def save_email_summaries(self, summaries: Dict[str, Tuple[str, str]], model: str):
+        """Store summaries as email id -> (content hash, summary), replacing older ones."""
+        if not summaries:
+            return
+        with self.transaction() as conn:
+            conn.executemany('''
+                INSERT OR REPLACE INTO email_summaries (email_id, content_hash, summary, model, created_at)
+                VALUES (?, ?, ?, ?, CURRENT_TIMESTAMP)
+            ''', [(email_id, content_hash, summary, model)
+                  for email_id, (content_hash, summary) in summaries.items()])
     
     def get_email_by_id(self, email_id: str) -> Optional[Dict]:
-        """Get email by ID."""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
+        """Get email by ID ('body' is None if it hasn't been downloaded yet)."""
+        cursor = self._connect().cursor()
         cursor.execute('''
-            SELECT id, subject, sender, date, snippet, body, importance_score
-            FROM emails WHERE id = ?
+            SELECT e.id, e.subject, e.sender, e.date, e.snippet, e.body, e.importance_score, c.category,
+                   e.sender_address, e.sender_domain
+            FROM emails e
+            LEFT JOIN email_categories c ON c.email_id = e.id
+            WHERE e.id = ?
         ''', (email_id,))
-        
         row = cursor.fetchone()
-        conn.close()
         
         if row:
             return {
@@ -517,6 +766,9 @@ class Database:
                 'date': row[3],
                 'snippet': row[4],
                 'body': row[5],
-                'importance_score': row[6]
+                'importance_score': row[6],
+                'category': row[7],
+                'sender_address': row[8],
+                'sender_domain': row[9]
             }
         return None
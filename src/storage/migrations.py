@@ -0,0 +1,386 @@
+import sqlite3
+import sys
+import os
+import time
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+
+from config.settings import EMBEDDING_MODEL
+from src.storage.database import Database, embedding_cache_key, email_timestamp
+from src.utils.categories import classify_email
+from src.utils.senders import parse_sender, reputation_domain, normalize_sender_entry
+
+
+# Schema history. Each migration runs once, in order, inside a single
+# transaction with PRAGMA user_version recording the last one applied.
+# Never edit or reorder a released migration; append a new one instead.
+
+
+def _create_base_tables(cursor: sqlite3.Cursor):
+    """Original schema (IF NOT EXISTS, so databases created before versioning pass through)."""
+    # Emails table
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS emails (
+            id TEXT PRIMARY KEY,
+            subject TEXT,
+            sender TEXT,
+            date TEXT,
+            snippet TEXT,
+            body TEXT,
+            thread_id TEXT,
+            account_type TEXT,
+            importance_score REAL DEFAULT 0.0,
+            created_at TEXT DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    
+    # Embeddings table
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS embeddings (
+            email_id TEXT PRIMARY KEY,
+            embedding BLOB,
+            created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (email_id) REFERENCES emails(id)
+        )
+    ''')
+    
+    # Feedback table
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS feedback (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            email_id TEXT,
+            is_important INTEGER,
+            created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (email_id) REFERENCES emails(id)
+        )
+    ''')
+    
+    # Sender patterns table (for learning)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS sender_patterns (
+            sender TEXT PRIMARY KEY,
+            important_count INTEGER DEFAULT 0,
+            not_important_count INTEGER DEFAULT 0,
+            last_updated TEXT DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    
+    # User preferences table
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS user_preferences (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            key TEXT UNIQUE,
+            value TEXT,
+            updated_at TEXT DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    
+    # Enhanced feedback table with categories and priorities
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS feedback_enhanced (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            email_id TEXT,
+            is_important INTEGER,
+            priority TEXT,
+            category TEXT,
+            notes TEXT,
+            created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (email_id) REFERENCES emails(id)
+        )
+    ''')
+    
+    # Email categories table
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS email_categories (
+            email_id TEXT PRIMARY KEY,
+            category TEXT,
+            confidence REAL,
+            created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (email_id) REFERENCES emails(id)
+        )
+    ''')
+    
+    # Brief delivery history
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS brief_deliveries (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            brief_text TEXT,
+            delivery_method TEXT,
+            delivery_status TEXT,
+            created_at TEXT DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    
+    # Important senders (user-defined)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS important_senders (
+            sender TEXT PRIMARY KEY,
+            priority TEXT,
+            category TEXT,
+            notes TEXT,
+            created_at TEXT DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    
+    # Category patterns (learn from feedback: e.g. "Promotions" often not important)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS category_patterns (
+            category TEXT PRIMARY KEY,
+            important_count INTEGER DEFAULT 0,
+            not_important_count INTEGER DEFAULT 0,
+            last_updated TEXT DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    
+    # Archived in our system only (user confirmed non-priority; we never write to Gmail)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS email_archived (
+            email_id TEXT PRIMARY KEY,
+            archived_at TEXT DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (email_id) REFERENCES emails(id)
+        )
+    ''')
+
+
+def _migrate_embeddings_to_blob(cursor: sqlite3.Cursor):
+    """Upgrade legacy comma-separated TEXT embeddings to float32 BLOBs."""
+    cursor.execute("SELECT email_id, embedding FROM embeddings WHERE typeof(embedding) = 'text'")
+    rows = cursor.fetchall()
+    if not rows:
+        return
+    cursor.executemany(
+        'UPDATE embeddings SET embedding = ? WHERE email_id = ?',
+        [(Database._encode_embedding(Database._decode_embedding(value)), email_id)
+         for email_id, value in rows]
+    )
+    print(f"Migrated {len(rows)} embeddings to binary float32 storage")
+
+
+def _create_embedding_cache(cursor: sqlite3.Cursor):
+    """Content-addressed embedding cache, seeded from embeddings already stored for emails."""
+    # key = embedding_cache_key(model, text)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS embedding_cache (
+            cache_key TEXT PRIMARY KEY,
+            embedding BLOB,
+            last_used REAL
+        )
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_embedding_cache_last_used ON embedding_cache(last_used)')
+    
+    cursor.execute('''
+        SELECT m.subject, m.snippet, e.embedding
+        FROM embeddings e
+        JOIN emails m ON m.id = e.email_id
+    ''')
+    now = time.time()
+    rows = [(embedding_cache_key(EMBEDDING_MODEL, f"{subject} {snippet}"), embedding, now)
+            for subject, snippet, embedding in cursor.fetchall()]
+    cursor.executemany(
+        'INSERT OR IGNORE INTO embedding_cache (cache_key, embedding, last_used) VALUES (?, ?, ?)', rows)
+
+
+def _create_sync_state(cursor: sqlite3.Cursor):
+    """Incremental sync position per account (Gmail historyId)."""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS sync_state (
+            account TEXT PRIMARY KEY,
+            history_id TEXT,
+            updated_at TEXT DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+
+def _add_email_timestamps(cursor: sqlite3.Cursor):
+    """Indexed date_ts (UTC epoch) column, backfilled from the ISO date text."""
+    cursor.execute('PRAGMA table_info(emails)')
+    if 'date_ts' not in [row[1] for row in cursor.fetchall()]:
+        cursor.execute('ALTER TABLE emails ADD COLUMN date_ts INTEGER')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_emails_date_ts ON emails(date_ts)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_emails_score_date ON emails(importance_score, date_ts)')
+    
+    cursor.execute('SELECT id, date FROM emails WHERE date_ts IS NULL')
+    rows = [(email_timestamp(date), email_id) for email_id, date in cursor.fetchall()]
+    rows = [row for row in rows if row[0] is not None]
+    if rows:
+        cursor.executemany('UPDATE emails SET date_ts = ? WHERE id = ?', rows)
+        print(f"Backfilled timestamps for {len(rows)} emails")
+
+
+# Tables whose changes invalidate views cached against get_data_version()
+VERSIONED_TABLES = ['emails', 'feedback', 'email_archived', 'category_patterns']
+
+
+def _create_data_version(cursor: sqlite3.Cursor):
+    """Single change counter, bumped by triggers on every write to VERSIONED_TABLES."""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS data_version (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            version INTEGER NOT NULL
+        )
+    ''')
+    cursor.execute('INSERT OR IGNORE INTO data_version (id, version) VALUES (1, 0)')
+    for table in VERSIONED_TABLES:
+        for event in ('INSERT', 'UPDATE', 'DELETE'):
+            cursor.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS {table}_{event.lower()}_bump_version
+                AFTER {event} ON {table}
+                BEGIN
+                    UPDATE data_version SET version = version + 1 WHERE id = 1;
+                END
+            ''')
+
+
+def _backfill_email_categories(cursor: sqlite3.Cursor):
+    """Categorize stored emails that have no email_categories row yet."""
+    cursor.execute('''
+        SELECT e.id, e.sender, e.subject FROM emails e
+        LEFT JOIN email_categories c ON c.email_id = e.id
+        WHERE c.email_id IS NULL
+    ''')
+    rows = [(email_id, *classify_email(sender, subject)) for email_id, sender, subject in cursor.fetchall()]
+    cursor.executemany(
+        'INSERT INTO email_categories (email_id, category, confidence) VALUES (?, ?, ?)', rows)
+    if rows:
+        print(f"Categorized {len(rows)} stored emails")
+
+
+def _normalize_senders(cursor: sqlite3.Cursor):
+    """
+    Index emails by normalized sender address and domain, and re-key
+    reputation on them.
+    
+    sender_patterns rows keyed by raw From headers are merged per address,
+    domain_patterns is built from the merged rows, and important_senders
+    entries such as '*@company.com' are stored as their canonical key.
+    """
+    cursor.execute('PRAGMA table_info(emails)')
+    columns = [row[1] for row in cursor.fetchall()]
+    for column in ('sender_address', 'sender_domain'):
+        if column not in columns:
+            cursor.execute(f'ALTER TABLE emails ADD COLUMN {column} TEXT')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_emails_sender_address ON emails(sender_address)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_emails_sender_domain ON emails(sender_domain)')
+    
+    cursor.execute('SELECT id, sender FROM emails WHERE sender_address IS NULL')
+    rows = [(*parse_sender(sender), email_id) for email_id, sender in cursor.fetchall()]
+    if rows:
+        cursor.executemany('UPDATE emails SET sender_address = ?, sender_domain = ? WHERE id = ?', rows)
+        print(f"Parsed sender addresses for {len(rows)} emails")
+    
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS domain_patterns (
+            domain TEXT PRIMARY KEY,
+            important_count INTEGER DEFAULT 0,
+            not_important_count INTEGER DEFAULT 0,
+            last_updated TEXT DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    
+    cursor.execute('SELECT sender, important_count, not_important_count, last_updated FROM sender_patterns')
+    senders, domains = {}, {}
+    for sender, important, not_important, last_updated in cursor.fetchall():
+        address, domain = parse_sender(sender)
+        for totals, key in ((senders, address), (domains, reputation_domain(domain))):
+            if not key:
+                continue
+            counts = totals.setdefault(key, [0, 0, last_updated])
+            counts[0] += important or 0
+            counts[1] += not_important or 0
+            counts[2] = max(counts[2] or '', last_updated or '')
+    cursor.execute('DELETE FROM sender_patterns')
+    cursor.executemany(
+        'INSERT INTO sender_patterns (sender, important_count, not_important_count, last_updated) VALUES (?, ?, ?, ?)',
+        [(key, *counts) for key, counts in senders.items()])
+    cursor.executemany(
+        'INSERT OR REPLACE INTO domain_patterns (domain, important_count, not_important_count, last_updated) VALUES (?, ?, ?, ?)',
+        [(key, *counts) for key, counts in domains.items()])
+    
+    cursor.execute('SELECT rowid, sender FROM important_senders')
+    for rowid, sender in cursor.fetchall():
+        key = normalize_sender_entry(sender)
+        if key != sender:
+            # A later entry for the same canonical key wins, like a re-save would
+            cursor.execute('DELETE FROM important_senders WHERE sender = ? AND rowid < ?', (key, rowid))
+            cursor.execute('UPDATE OR IGNORE important_senders SET sender = ? WHERE rowid = ?', (key, rowid))
+            cursor.execute('DELETE FROM important_senders WHERE rowid = ? AND sender != ?', (rowid, key))
+
+
+def _create_brief_cache(cursor: sqlite3.Cursor):
+    """Generated briefs keyed by BriefSummarizer.brief_cache_key (top email IDs, scores, model, prompt)."""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS brief_cache (
+            cache_key TEXT PRIMARY KEY,
+            brief_text TEXT,
+            model TEXT,
+            created_at REAL,
+            last_used REAL
+        )
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_brief_cache_last_used ON brief_cache(last_used)')
+
+
+def _create_email_summaries(cursor: sqlite3.Cursor):
+    """One-sentence summary per email, reused by every brief it appears in."""
+    # content_hash = BriefSummarizer.summary_hash(email); a mismatch means regenerate
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS email_summaries (
+            email_id TEXT PRIMARY KEY,
+            content_hash TEXT,
+            summary TEXT,
+            model TEXT,
+            created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (email_id) REFERENCES emails(id)
+        )
+    ''')
+
+
+def _key_sync_state_by_mailbox(cursor: sqlite3.Cursor):
+    """Drop sync positions saved under a bare account name: their mailbox is unknown."""
+    # Keys are now '<account>:<mailbox address>' (see sync_cursor_key)
+    cursor.execute("DELETE FROM sync_state WHERE account NOT LIKE '%:%'")
+
+
+MIGRATIONS = [
+    (1, _create_base_tables),
+    (2, _migrate_embeddings_to_blob),
+    (3, _create_embedding_cache),
+    (4, _create_sync_state),
+    (5, _add_email_timestamps),
+    (6, _create_data_version),
+    (7, _backfill_email_categories),
+    (8, _normalize_senders),
+    (9, _create_brief_cache),
+    (10, _create_email_summaries),
+    (11, _key_sync_state_by_mailbox),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+def get_schema_version(conn: sqlite3.Connection) -> int:
+    """Last migration applied to the database (0 for a new or pre-versioning file)."""
+    return conn.execute('PRAGMA user_version').fetchone()[0]
+
+
+def migrate(db: Database) -> int:
+    """
+    Apply pending migrations to db's file.
+    
+    A current database costs a single PRAGMA read. All pending migrations
+    commit together, so a failure leaves the previous version intact.
+    
+    Returns:
+        Number of migrations applied
+    """
+    if get_schema_version(db._connect()) >= SCHEMA_VERSION:
+        return 0
+    
+    with db.transaction() as conn:
+        # Re-check inside the transaction in case another process just migrated
+        version = get_schema_version(conn)
+        pending = [(number, step) for number, step in MIGRATIONS if number > version]
+        cursor = conn.cursor()
+        for number, step in pending:
+            step(cursor)
+            cursor.execute(f'PRAGMA user_version = {number}')
+    return len(pending)
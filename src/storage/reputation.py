@@ -0,0 +1,61 @@
+from typing import Dict, List, Optional, Tuple
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+
+from src.utils.senders import domain_candidates, reputation_domain
+
+
+class ReputationSnapshot:
+    """
+    In-memory copy of sender_patterns, domain_patterns, category_patterns
+    and important_senders.
+    
+    Loaded once by Database.get_reputation_snapshot() and then kept current
+    by the feedback writes themselves (applied when their transaction
+    commits), so scoring looks reputations up without touching SQLite.
+    Callers outside Database should treat it as read-only.
+    """
+    
+    def __init__(self, senders: Dict[str, List[int]], domains: Dict[str, List[int]],
+                 categories: Dict[str, List[int]], important_senders: Dict[str, str], version: Tuple):
+        # name -> [important_count, not_important_count]
+        self._counts = {'sender': senders, 'domain': domains, 'category': categories}
+        # Normalized address or domain -> priority
+        self.important_senders = important_senders
+        self.version = version
+    
+    @staticmethod
+    def _ratio(counts: List[int]) -> float:
+        """Share of important feedback (0.5 when there is none)."""
+        if not counts:
+            return 0.5  # Neutral
+        important, not_important = counts
+        total = important + not_important
+        if total == 0:
+            return 0.5
+        return important / total
+    
+    def sender_reputation(self, address: str, domain: str = '') -> float:
+        """Same value as Database.get_sender_reputation, from memory (address, else domain)."""
+        counts = self._counts['sender'].get(address)
+        if not counts or not sum(counts):
+            counts = self._counts['domain'].get(reputation_domain(domain))
+        return self._ratio(counts)
+    
+    def category_reputation(self, category: str) -> float:
+        """Same value as Database.get_category_reputation, from memory."""
+        return self._ratio(self._counts['category'].get(category))
+    
+    def important_sender_priority(self, address: str, domain: str = '') -> Optional[str]:
+        """Priority of the important_senders entry matching the address, its domain or a parent domain."""
+        for key in [address] + domain_candidates(domain):
+            priority = self.important_senders.get(key)
+            if priority:
+                return priority
+        return None
+    
+    def _record(self, kind: str, name: str, is_important: bool):
+        """Apply one committed feedback write ('sender', 'domain' or 'category')."""
+        counts = self._counts[kind].setdefault(name, [0, 0])
+        counts[0 if is_important else 1] += 1
@@ -5,6 +5,7 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
 import click
 from datetime import datetime
 from src.email_connectors.gmail import GmailConnector
+from src.email_connectors.sync import iter_sync_pages
 from src.storage.database import Database
 from src.ai.scorer import ImportanceScorer
 from src.ai.summarizer import BriefSummarizer
@@ -68,14 +69,14 @@ def fetch(hours):
         click.echo("💡 Run 'python main.py setup' to configure your account through the web UI")
         return
     
-    emails = gmail.fetch_recent_emails(hours=hours)
-    click.echo(f"Found {len(emails)} emails")
+    # Incremental: only messages not already stored are downloaded and saved, page by page
+    count = 0
+    for page in iter_sync_pages(db, gmail, hours=hours):
+        count += len(page)
+        click.echo(f"  ...{count} new emails so far")
+    click.echo(f"Found {count} new emails")
     
-    # Save emails
-    for email in emails:
-        db.save_email(email, account_type='gmail')
-    
-    click.echo(f"✅ Saved {len(emails)} emails to database")
+    click.echo(f"✅ Saved {count} emails to database")
 
 
 @cli.command()
@@ -89,16 +90,16 @@ def score():
     emails = db.get_recent_emails(hours=EMAIL_FETCH_HOURS)
     click.echo(f"Scoring {len(emails)} emails...")
     
-    for email in emails:
-        score = scorer.score_email(email)
-        db.update_importance_score(email['id'], score)
+    scores = scorer.score_emails(emails)
+    db.update_importance_scores({email['id']: score for email, score in zip(emails, scores)})
+    for email, score in zip(emails, scores):
         click.echo(f"  {email['subject'][:50]:50} | Score: {score:.2f}")
     
     click.echo("✅ Scoring complete")
 
 
 @cli.command()
-@click.option('--top', default=None, help='Number of top emails to include')
+@click.option('--top', default=None, type=int, help='Number of top emails to include')
 @click.option('--send-email', is_flag=True, help='Send brief via email')
 @click.option('--web', is_flag=True, help='Open brief in web dashboard')
 def brief(top, send_email, web):
@@ -106,7 +107,7 @@ def brief(top, send_email, web):
     click.echo("Generating daily brief...")
     
     db = Database()
-    summarizer = BriefSummarizer()
+    summarizer = BriefSummarizer(db)
     
     # Get user preference for top N
     if top is None:
@@ -0,0 +1,247 @@
+import json
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterator, Optional, Tuple
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+
+from flask import Flask, Response, jsonify
+from config.settings import EMAIL_FETCH_HOURS, BACKGROUND_JOB_WORKERS
+
+
+class JobCancelled(Exception):
+    """Raised inside a job function when the user cancelled the job."""
+
+
+class Job:
+    """One background fetch/score run, with progress that can be streamed to the browser."""
+    
+    FINISHED = ('done', 'failed', 'cancelled')
+    
+    def __init__(self, kind: str):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.status = 'queued'
+        self.done = 0
+        self.total = None
+        self.message = ''
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.revision = 0  # Bumped on every change; SSE streams wait on it
+        self._changed = threading.Condition()
+        self._cancel = threading.Event()
+    
+    @property
+    def finished(self) -> bool:
+        return self.status in self.FINISHED
+    
+    def cancel(self):
+        """Ask the job to stop at its next progress report (a queued job never starts)."""
+        self._cancel.set()
+        self._transition('queued', 'cancelled', message='Cancelled')
+    
+    def report(self, done: int = None, total: int = None, message: str = None):
+        """
+        Record progress from inside the job function.
+        
+        Raises:
+            JobCancelled: if cancellation was requested (stops the job here)
+        """
+        if self._cancel.is_set():
+            raise JobCancelled()
+        changes = {'done': done, 'total': total, 'message': message}
+        self._update(**{key: value for key, value in changes.items() if value is not None})
+    
+    def _transition(self, expected: str, status: str, **changes) -> bool:
+        """
+        Move from status expected to status atomically.
+        
+        Returns:
+            False (and changes nothing) if the job was no longer in expected
+        """
+        with self._changed:
+            if self.status != expected:
+                return False
+            self._update(status=status, **changes)
+            return True
+    
+    def _update(self, **changes):
+        with self._changed:
+            for key, value in changes.items():
+                setattr(self, key, value)
+            self.revision += 1
+            self._changed.notify_all()
+    
+    def wait(self, revision: int, timeout: float) -> int:
+        """Block until the job changes past revision (or timeout); returns the current revision."""
+        with self._changed:
+            self._changed.wait_for(lambda: self.revision != revision, timeout=timeout)
+            return self.revision
+    
+    def to_dict(self) -> Dict:
+        return {
+            'id': self.id,
+            'kind': self.kind,
+            'status': self.status,
+            'done': self.done,
+            'total': self.total,
+            'message': self.message,
+            'result': self.result,
+            'error': self.error,
+        }
+
+
+class JobManager:
+    """
+    In-process job queue: actions return a job id immediately and run on a
+    small thread pool. At most one job of each kind is active at a time;
+    submitting another returns the one already running.
+    """
+    
+    def __init__(self, max_workers: int = BACKGROUND_JOB_WORKERS, history: int = 50):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='job')
+        self._lock = threading.Lock()
+        self._jobs: Dict[str, Job] = {}
+        self._active: Dict[str, Job] = {}
+        self._history = history
+    
+    def submit(self, kind: str, fn: Callable, *args) -> Tuple[Job, bool]:
+        """
+        Run fn(job, *args) in the background unless a job of this kind is active.
+        
+        Returns:
+            (job, created): created is False if an existing job was returned
+        """
+        with self._lock:
+            active = self._active.get(kind)
+            if active and not active.finished:
+                return active, False
+            job = Job(kind)
+            self._jobs[job.id] = job
+            self._active[kind] = job
+            self._prune()
+        self._executor.submit(self._run, job, fn, args)
+        return job, True
+    
+    def get(self, job_id: str) -> Optional[Job]:
+        return self._jobs.get(job_id)
+    
+    def _prune(self):
+        """Forget the oldest finished jobs beyond the history limit."""
+        finished = [job for job in self._jobs.values() if job.finished]
+        for job in sorted(finished, key=lambda job: job.created_at)[:max(0, len(finished) - self._history)]:
+            del self._jobs[job.id]
+    
+    def _run(self, job: Job, fn: Callable, args):
+        if not job._transition('queued', 'running'):  # Cancelled while queued
+            return
+        try:
+            result = fn(job, *args)
+            job._update(status='done', result=result)
+        except JobCancelled:
+            job._update(status='cancelled', message='Cancelled')
+        except Exception as e:
+            print(f"[JOB {job.kind}] Error: {e}")
+            job._update(status='failed', error=str(e))
+    
+    def stream(self, job: Job, keepalive: float = 15.0) -> Iterator[str]:
+        """Server-Sent Events for job: one 'progress' event per change, ending with 'end'."""
+        revision = None
+        while True:
+            current = job.wait(revision, keepalive) if revision is not None else job.revision
+            if current == revision:
+                yield ': keepalive\n\n'
+                continue
+            revision = current
+            event = 'end' if job.finished else 'progress'
+            yield f"event: {event}\ndata: {json.dumps(job.to_dict())}\n\n"
+            if job.finished:
+                return
+
+
+jobs = JobManager()
+
+
+def fetch_job(job: Job, hours: int = EMAIL_FETCH_HOURS) -> Dict:
+    """Download new Gmail messages page by page (pages already saved survive a cancel)."""
+    from src.storage.database import Database
+    from src.email_connectors.gmail import GmailConnector
+    from src.email_connectors.sync import iter_sync_pages
+    
+    gmail = GmailConnector()
+    if not gmail.authenticate():
+        raise Exception('Gmail authentication failed. Please connect your account first.')
+    
+    job.report(message='Listing new messages...')
+    count = 0
+    for page in iter_sync_pages(Database(), gmail, hours=hours):
+        count += len(page)
+        job.report(done=count, message=f'Fetched {count} new emails')
+    return {'count': count}
+
+
+def score_job(job: Job, hours: int = EMAIL_FETCH_HOURS) -> Dict:
+    """
+    Score the emails in the window, reporting progress after each slice.
+    
+    A slice is as many emails as the scorer embeds at once (batch size times
+    concurrency), so its requests still run in parallel.
+    """
+    from src.storage.database import Database
+    from src.ai.scorer import ImportanceScorer
+    
+    db = Database()
+    scorer = ImportanceScorer(db)
+    emails = db.get_recent_emails(hours=hours)
+    if not emails:
+        raise Exception('No emails found. Please fetch emails first.')
+    
+    job.report(done=0, total=len(emails), message=f'Scoring {len(emails)} emails...')
+    slice_size = scorer.batch_size * scorer.concurrency
+    for start in range(0, len(emails), slice_size):
+        chunk = emails[start:start + slice_size]
+        scores = scorer.score_emails(chunk)
+        db.update_importance_scores({email['id']: score for email, score in zip(chunk, scores)})
+        done = start + len(chunk)
+        job.report(done=done, message=f'Scored {done} of {len(emails)} emails')
+    return {'count': len(emails)}
+
+
+JOB_FUNCTIONS = {'fetch': fetch_job, 'score': score_job}
+
+
+def start_job(kind: str, hours: int = EMAIL_FETCH_HOURS) -> Tuple[Job, bool]:
+    """Start a 'fetch' or 'score' job (or return the one already running)."""
+    return jobs.submit(kind, JOB_FUNCTIONS[kind], hours)
+
+
+def register_job_routes(app: Flask):
+    """Add /jobs/<id> (status), /jobs/<id>/events (SSE) and /jobs/<id>/cancel to app."""
+    
+    def job_status(job_id):
+        job = jobs.get(job_id)
+        if not job:
+            return jsonify({'error': 'Job not found'}), 404
+        return jsonify(job.to_dict())
+    
+    def job_events(job_id):
+        job = jobs.get(job_id)
+        if not job:
+            return jsonify({'error': 'Job not found'}), 404
+        return Response(jobs.stream(job), mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+    
+    def job_cancel(job_id):
+        job = jobs.get(job_id)
+        if not job:
+            return jsonify({'error': 'Job not found'}), 404
+        job.cancel()
+        return jsonify(job.to_dict())
+    
+    app.add_url_rule('/jobs/<job_id>', 'job_status', job_status)
+    app.add_url_rule('/jobs/<job_id>/events', 'job_events', job_events)
+    app.add_url_rule('/jobs/<job_id>/cancel', 'job_cancel', job_cancel, methods=['POST'])
@@ -5,6 +5,7 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
 import click
 from src.storage.database import Database
 from src.email_connectors.gmail import GmailConnector
+from src.email_connectors.sync import iter_sync_pages
 from src.ai.scorer import ImportanceScorer
 from src.ai.summarizer import BriefSummarizer
 from src.ui.onboarding import OnboardingWizard
@@ -117,22 +118,25 @@ class MainLauncher:
             return
         
         hours = int(self.db.get_user_preference('email_fetch_hours', str(EMAIL_FETCH_HOURS)) or EMAIL_FETCH_HOURS)
-        emails = gmail.fetch_recent_emails(hours=hours)
-        click.echo(f"✅ Found {len(emails)} emails")
-        
-        # Save emails
-        for email in emails:
-            self.db.save_email(email, account_type='gmail')
-        click.echo(f"✅ Saved {len(emails)} emails to database")
-        
-        # Score
+        scorer = ImportanceScorer(self.db)
+        
+        # New emails are scored page by page as they arrive
+        scored = set()
+        for page in iter_sync_pages(self.db, gmail, hours=hours):
+            scores = scorer.score_emails(page)
+            self.db.update_importance_scores({email['id']: score for email, score in zip(page, scores)})
+            scored.update(email['id'] for email in page)
+            click.echo(f"  ...{len(scored)} new emails fetched and scored")
+        click.echo(f"✅ Found {len(scored)} new emails")
+        click.echo(f"✅ Saved {len(scored)} emails to database")
+        
+        # Re-score the rest of the window (cached embeddings make this cheap)
+        emails = [email for email in self.db.get_recent_emails(hours=hours) if email['id'] not in scored]
         if emails:
             click.echo("\n🎯 Scoring email importance...")
-            scorer = ImportanceScorer(self.db)
             
-            for email in emails:
-                score = scorer.score_email(email)
-                self.db.update_importance_score(email['id'], score)
+            scores = scorer.score_emails(emails)
+            self.db.update_importance_scores({email['id']: score for email, score in zip(emails, scores)})
             
             click.echo("✅ Scoring complete")
         
@@ -157,7 +161,7 @@ class MainLauncher:
         
         # Generate brief
         click.echo("🤖 Generating brief with AI...")
-        summarizer = BriefSummarizer()
+        summarizer = BriefSummarizer(self.db)
         
         top_n = int(self.db.get_user_preference('brief_top_n', '10') or '10')
         emails.sort(key=lambda x: x.get('importance_score', 0), reverse=True)
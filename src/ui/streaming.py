@@ -0,0 +1,26 @@
+import json
+from typing import Iterable
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+
+from flask import Response
+
+
+def brief_event_stream(chunks: Iterable[str]) -> Response:
+    """
+    Stream brief HTML as Server-Sent Events.
+    
+    Sends one 'chunk' event per fragment (data: {"html": ...}) and a final
+    'end' event, so the page can show the brief while it is being written.
+    """
+    def events():
+        try:
+            for html in chunks:
+                yield f"event: chunk\ndata: {json.dumps({'html': html})}\n\n"
+        except Exception as e:
+            print(f"[BRIEF STREAM] Error: {e}")
+        yield 'event: end\ndata: {}\n\n'
+    
+    return Response(events(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
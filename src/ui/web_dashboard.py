@@ -5,13 +5,15 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
 from flask import Flask, render_template_string, jsonify, request
 from src.storage.database import Database
 from src.ai.summarizer import BriefSummarizer
-from src.ai.scorer import ImportanceScorer
-from src.email_connectors.gmail import GmailConnector
+from src.email_connectors.sync import get_email_with_body
 from src.ui.feedback import InteractiveFeedback
+from src.ui.jobs import start_job, register_job_routes
+from src.ui.streaming import brief_event_stream
 from config.settings import EMAIL_FETCH_HOURS
 
 app = Flask(__name__)
 app.secret_key = os.urandom(24)
+register_job_routes(app)
 
 DASHBOARD_HTML = """
 <!DOCTYPE html>
@@ -304,27 +306,36 @@ DASHBOARD_HTML = """
             else if (tabName === 'stats') loadStats();
         }
         
+        let briefSource = null;
+        
         function loadBrief() {
-            fetch('/api/brief')
-                .then(r => r.json())
-                .then(data => {
-                    document.getElementById('brief-loading').style.display = 'none';
-                    const content = document.getElementById('brief-content');
-                    if (data.brief) {
-                        content.innerHTML = '<div class="brief-content">' + 
-                            data.brief.replace(/\\n/g, '<br>') + '</div>';
-                    } else {
-                        content.innerHTML = '<div class="empty-state">' +
-                            '<div class="empty-state-icon">📭</div>' +
-                            '<h3>No brief available</h3>' +
-                            '<p>Fetch and score your emails first, then generate a brief.</p>' +
-                            '<div style="margin-top: 20px;">' +
-                            '<button class="btn-action" onclick="fetchEmails()">📥 Fetch Emails</button>' +
-                            '<button class="btn-action" onclick="scoreEmails()">⭐ Score Emails</button>' +
-                            '<button class="btn-action" onclick="generateBrief()">📊 Generate Brief</button>' +
-                            '</div></div>';
-                    }
-                });
+            // Streamed: each 'chunk' event is more of the brief's HTML
+            if (briefSource) briefSource.close();
+            const source = briefSource = new EventSource('/api/brief/stream');
+            const content = document.getElementById('brief-content');
+            let brief = '';
+            source.addEventListener('chunk', e => {
+                brief += JSON.parse(e.data).html;
+                document.getElementById('brief-loading').style.display = 'none';
+                content.innerHTML = '<div class="brief-content">' + 
+                    brief.replace(/\\n/g, '<br>') + '</div>';
+            });
+            source.addEventListener('end', () => {
+                source.close();
+                document.getElementById('brief-loading').style.display = 'none';
+                if (!brief) {
+                    content.innerHTML = '<div class="empty-state">' +
+                        '<div class="empty-state-icon">📭</div>' +
+                        '<h3>No brief available</h3>' +
+                        '<p>Fetch and score your emails first, then generate a brief.</p>' +
+                        '<div style="margin-top: 20px;">' +
+                        '<button class="btn-action" onclick="fetchEmails()">📥 Fetch Emails</button>' +
+                        '<button class="btn-action" onclick="scoreEmails()">⭐ Score Emails</button>' +
+                        '<button class="btn-action" onclick="generateBrief()">📊 Generate Brief</button>' +
+                        '</div></div>';
+                }
+            });
+            source.onerror = () => source.close();
         }
         
         function loadEmails() {
@@ -424,19 +435,30 @@ DASHBOARD_HTML = """
             });
         }
         
+        function watchJob(data, label) {
+            if (!data.success) {
+                alert('❌ Error: ' + (data.error || 'Failed to start ' + label));
+                return;
+            }
+            const source = new EventSource(`/jobs/${data.job.id}/events`);
+            source.addEventListener('end', e => {
+                const job = JSON.parse(e.data);
+                source.close();
+                if (job.status === 'done') {
+                    alert(`✅ ${label}: ${job.message || 'done'}`);
+                    loadEmails();
+                    loadBrief();
+                    loadStats();
+                } else if (job.status === 'failed') {
+                    alert('❌ Error: ' + job.error);
+                }
+            });
+        }
+        
         function fetchEmails() {
             fetch('/action/fetch', {method: 'POST'})
                 .then(r => r.json())
-                .then(data => {
-                    if (data.success) {
-                        alert('✅ Emails fetched successfully!');
-                        loadEmails();
-                        loadBrief();
-                        loadStats();
-                    } else {
-                        alert('❌ Error: ' + (data.error || 'Failed to fetch emails'));
-                    }
-                })
+                .then(data => watchJob(data, 'Fetch emails'))
                 .catch(err => {
                     alert('❌ Error: ' + err.message);
                 });
@@ -445,16 +467,7 @@ DASHBOARD_HTML = """
         function scoreEmails() {
             fetch('/action/score', {method: 'POST'})
                 .then(r => r.json())
-                .then(data => {
-                    if (data.success) {
-                        alert('✅ Emails scored successfully!');
-                        loadEmails();
-                        loadBrief();
-                        loadStats();
-                    } else {
-                        alert('❌ Error: ' + (data.error || 'Failed to score emails'));
-                    }
-                })
+                .then(data => watchJob(data, 'Score emails'))
                 .catch(err => {
                     alert('❌ Error: ' + err.message);
                 });
@@ -493,7 +506,7 @@ def dashboard():
 def api_brief():
     """Get latest brief."""
     db = Database()
-    summarizer = BriefSummarizer()
+    summarizer = BriefSummarizer(db)
     
     emails = db.get_recent_emails(hours=EMAIL_FETCH_HOURS)
     emails.sort(key=lambda x: x.get('importance_score', 0), reverse=True)
@@ -506,6 +519,21 @@ def api_brief():
     
     return jsonify({'brief': brief})
 
+@app.route('/api/brief/stream')
+def api_brief_stream():
+    """Latest brief as Server-Sent Events, shown while it is generated."""
+    db = Database()
+    summarizer = BriefSummarizer(db)
+    
+    emails = db.get_recent_emails(hours=EMAIL_FETCH_HOURS)
+    emails.sort(key=lambda x: x.get('importance_score', 0), reverse=True)
+    
+    if not emails:
+        return brief_event_stream([])
+    
+    top_n = int(db.get_user_preference('brief_top_n', '10') or '10')
+    return brief_event_stream(summarizer.stream_brief(emails, top_n=top_n))
+
 @app.route('/api/emails')
 def api_emails():
     """Get recent emails."""
@@ -519,7 +547,7 @@ def api_emails():
 def api_email(email_id):
     """Get email by ID."""
     db = Database()
-    email = db.get_email_by_id(email_id)
+    email = get_email_with_body(db, email_id)
     
     if not email:
         return jsonify({'error': 'Email not found'}), 404
@@ -553,51 +581,22 @@ def api_stats():
 
 @app.route('/action/fetch', methods=['POST'])
 def action_fetch():
-    """Fetch emails from Gmail."""
-    try:
-        gmail = GmailConnector()
-        if not gmail.authenticate():
-            return jsonify({'success': False, 'error': 'Gmail authentication failed. Please connect your account first.'})
-        
-        emails = gmail.fetch_recent_emails(hours=EMAIL_FETCH_HOURS)
-        db = Database()
-        
-        count = 0
-        for email in emails:
-            db.save_email(email, account_type='gmail')
-            count += 1
-        
-        return jsonify({'success': True, 'count': count})
-    except Exception as e:
-        return jsonify({'success': False, 'error': str(e)})
+    """Fetch emails from Gmail (background job; progress at /jobs/<id>/events)."""
+    job, created = start_job('fetch', hours=EMAIL_FETCH_HOURS)
+    return jsonify({'success': True, 'job': job.to_dict(), 'already_running': not created})
 
 @app.route('/action/score', methods=['POST'])
 def action_score():
-    """Score email importance."""
-    try:
-        db = Database()
-        scorer = ImportanceScorer(db)
-        
-        emails = db.get_recent_emails(hours=EMAIL_FETCH_HOURS)
-        if not emails:
-            return jsonify({'success': False, 'error': 'No emails found. Please fetch emails first.'})
-        
-        count = 0
-        for email in emails:
-            score = scorer.score_email(email)
-            db.update_importance_score(email['id'], score)
-            count += 1
-        
-        return jsonify({'success': True, 'count': count})
-    except Exception as e:
-        return jsonify({'success': False, 'error': str(e)})
+    """Score email importance (background job; progress at /jobs/<id>/events)."""
+    job, created = start_job('score', hours=EMAIL_FETCH_HOURS)
+    return jsonify({'success': True, 'job': job.to_dict(), 'already_running': not created})
 
 @app.route('/action/generate-brief', methods=['POST'])
 def action_generate_brief():
     """Generate daily brief."""
     try:
         db = Database()
-        summarizer = BriefSummarizer()
+        summarizer = BriefSummarizer(db)
         
         emails = db.get_recent_emails(hours=EMAIL_FETCH_HOURS)
         if not emails:
@@ -0,0 +1,190 @@
+"""Shared brief rendering: markdown clean-up for model output and the HTML email body."""
+
+import re
+from typing import List
+
+# Patterns are compiled once; each line is dispatched on its first character
+# so it only meets the patterns that could match it
+_RULE = re.compile(r'=+\s*')
+_HEADER = re.compile(r'(#{1,3})\s+(\S.*)')
+_BOLD = re.compile(r'\*\*(.+?)\*\*')
+_BULLET = re.compile(r'[-*]\s+(\S.*)')
+_NUMBERED = re.compile(r'\d+\.\s+(\S.*)')
+
+
+def markdown_line(line: str) -> str:
+    """Convert one line's markdown ('===' rules, # headers, **bold**, - / 1. items) to HTML."""
+    first = line[:1]
+    if first == '=':
+        # Remove markdown header separators
+        if _RULE.fullmatch(line):
+            return ''
+    elif first == '#':
+        # Convert markdown headers to HTML if needed
+        match = _HEADER.fullmatch(line)
+        if match:
+            level = len(match.group(1))
+            line = f'<h{level}>{match.group(2)}</h{level}>'
+
+    # Convert markdown bold
+    if '**' in line:
+        line = _BOLD.sub(r'<strong>\1</strong>', line)
+
+    # Convert markdown lists (handle both - and *) and numbered lists
+    first = line[:1]
+    if first == '-' or first == '*':
+        match = _BULLET.fullmatch(line)
+        if match:
+            return f'<li>{match.group(1)}</li>'
+    elif first.isdigit():
+        match = _NUMBERED.fullmatch(line)
+        if match:
+            return f'<li>{match.group(1)}</li>'
+    return line
+
+
+class BriefHtmlNormalizer:
+    """
+    Markdown -> HTML clean-up for model output, applied one line at a time.
+
+    feed() takes raw text as it arrives and returns the HTML for every line
+    completed so far; close() flushes the rest. The model is asked for HTML,
+    so this only repairs markdown that slips through: headers, bold, bullet
+    and numbered items (wrapped in <ul>), '===' rules and runs of blank lines.
+
+    Unlike the whole-string regexes this replaced, a marker only applies to
+    text on its own line: '#\\nfoo' used to become '<h1>foo</h1>' and '-'
+    followed by whitespace an empty '<li>'; both are now left as they are.
+    Trailing whitespace of the last line is kept when a line break follows it.
+    """
+
+    def __init__(self):
+        self._buffer = ''
+        self._started = False  # Leading whitespace is dropped, like str.strip()
+        self._held = []  # Whitespace-only lines, dropped if nothing follows them
+        self._emitted = False
+        self._newlines = 0  # Line breaks not yet written (runs of 3+ collapse to 2)
+        self._in_list = False
+        self._out: List[str] = []
+
+    def feed(self, text: str) -> str:
+        """Add raw model output; returns HTML for the lines it completed."""
+        if not self._started:
+            text = text.lstrip()
+            if not text:
+                return ''
+            self._started = True
+        self._buffer += text
+        *lines, self._buffer = self._buffer.split('\n')
+        for line in lines:
+            if not line.strip():
+                self._held.append(line)
+                continue
+            self._flush_held()
+            self._line(line)
+        return self._take()
+
+    def close(self) -> str:
+        """Flush the last line and close an open list (trailing whitespace is dropped)."""
+        if self._buffer.strip():
+            self._flush_held()
+            self._line(self._buffer.rstrip())
+        self._buffer = ''
+        self._held = []
+        if self._in_list:
+            self._emit('</ul>')
+            self._in_list = False
+        if self._newlines:
+            self._out.append('\n' * min(self._newlines, 2))
+        return self._take()
+
+    def _take(self) -> str:
+        html = ''.join(self._out)
+        self._out = []
+        return html
+
+    def _flush_held(self):
+        for held in self._held:
+            self._line(held)
+        self._held = []
+
+    def _line(self, line: str):
+        line = markdown_line(line)
+
+        # Wrap consecutive <li> in <ul>
+        stripped = line.strip()
+        if stripped.startswith('<li>'):
+            if not self._in_list:
+                self._emit('<ul>')
+                self._in_list = True
+        elif stripped.startswith(('</li>', '</ul>', '</ol>')):
+            if self._in_list:
+                self._emit('</ul>')
+                self._in_list = False
+        elif self._in_list and not stripped.startswith('<'):
+            self._emit('</ul>')
+            self._in_list = False
+        self._emit(line)
+
+    def _emit(self, line: str):
+        if self._emitted:
+            self._newlines += 1
+        self._emitted = True
+        if line == '':
+            return
+        if self._newlines:
+            self._out.append('\n' * min(self._newlines, 2))
+        self._out.append(line)
+        self._newlines = 0
+
+
+def clean_brief_html(text: str) -> str:
+    """Normalize a complete model response (see BriefHtmlNormalizer)."""
+    normalizer = BriefHtmlNormalizer()
+    return normalizer.feed(text) + normalizer.close()
+
+
+_EMAIL_HEAD = """
+        <!DOCTYPE html>
+        <html>
+        <head>
+            <style>
+                body { font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', sans-serif; 
+                       line-height: 1.6; color: #333; max-width: 800px; margin: 0 auto; padding: 20px; }
+                h1 { color: #1e3c72; border-bottom: 3px solid #f5a623; padding-bottom: 10px; }
+                .email-item { background: #f8f9fa; padding: 15px; margin: 15px 0; 
+                             border-left: 4px solid #2a5298; border-radius: 4px; }
+                .score { color: #f5a623; font-weight: bold; }
+                .footer { margin-top: 30px; padding-top: 20px; border-top: 1px solid #ddd; 
+                         color: #666; font-size: 12px; }
+            </style>
+        </head>
+        <body>
+        """
+
+_EMAIL_FOOT = """
+            <div class="footer">
+                <p>This brief was generated by Daily Email Brief.</p>
+                <p>To adjust your preferences, run: python main.py preferences</p>
+            </div>
+        </body>
+        </html>
+        """
+
+
+def brief_email_html(brief_text: str) -> str:
+    """Full HTML document for emailing a brief (one element per line of brief_text)."""
+    parts = [_EMAIL_HEAD]
+    for line in brief_text.split('\n'):
+        if line.startswith('='):
+            parts.append("<hr>")
+        elif line.startswith('📬'):
+            parts.append(f"<h1>{line}</h1>")
+        elif line.startswith(('From:', 'Subject:')):
+            parts.append(f"<p><strong>{line}</strong></p>")
+        elif line.strip():
+            parts.append(f"<p>{line}</p>")
+        else:
+            parts.append("<br>")
+    parts.append(_EMAIL_FOOT)
+    return ''.join(parts)
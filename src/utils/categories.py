@@ -1,34 +1,94 @@
 """Shared category logic for email classification."""
 
+import re
+from functools import lru_cache
+from typing import Dict, Tuple
 
+# (category, keywords, fields searched) in precedence order: the first rule
+# with a keyword in one of its fields wins.
+CATEGORY_RULES = [
+    ('Newsletters', ['newsletter', 'digest', 'news', 'update', 'substack', 'medium'], ('sender',)),
+    ('Promotions', ['promo', 'sale', 'deal', 'offer', 'discount', 'coupon', '$', 'fare', 'airline', 'hotel', 'booking'], ('sender', 'subject')),
+    ('Healthcare', ['hospital', 'clinic', 'medical', 'health', 'doctor', 'pharmacy', 'appointment'], ('sender',)),
+    ('Financial', ['bank', 'credit', 'payment', 'invoice', 'billing', 'paypal', 'stripe', 'financial'], ('sender',)),
+    ('Social Media', ['linkedin', 'twitter', 'facebook', 'instagram', 'social'], ('sender',)),
+    ('Work/Jobs', ['job', 'career', 'recruiter', 'hiring', 'interview', 'application'], ('sender',)),
+    ('Security Alerts', ['security', 'alert', 'login', 'password', 'verify', 'suspicious'], ('subject',)),
+    ('Shopping', ['amazon', 'ebay', 'shop', 'store', 'retail', 'delivery', 'shipping'], ('sender',)),
+    ('Technology', ['github', 'stackoverflow', 'tech', 'software', 'developer', 'code'], ('sender',)),
+    ('Education', ['university', 'school', 'course', 'education', 'learning', 'coursera', 'udemy'], ('sender',)),
+    ('Travel', ['travel', 'trip', 'flight', 'airline', 'hotel', 'booking', 'expedia'], ('sender',)),
+    ('Notifications', ['noreply', 'no-reply', 'notification', 'alert', 'reminder'], ('sender',)),
+]
+
+CATEGORIES = [category for category, _, _ in CATEGORY_RULES] + ['Other']
+
+
+def _trie_pattern(words) -> str:
+    """Regex alternation of words factored into a prefix trie (one branch per character)."""
+    trie = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[''] = {}
+
+    def build(node):
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        if len(branches) == 1 and '' not in node:
+            return branches[0]
+        group = '(?:' + '|'.join(branches) + ')'
+        return group + '?' if '' in node else group
+
+    return build(trie)
+
+
+def _compile(field: str):
+    """
+    One regex finding every keyword searched in field, plus keyword -> rule index.
+
+    The lookahead reports a match at every position, overlapping ones
+    included. At a given position the trie returns the longest keyword, so
+    its rank also covers the shorter keywords that are prefixes of it.
+    """
+    rank = {}
+    for index, (_, keywords, fields) in enumerate(CATEGORY_RULES):
+        if field in fields:
+            for keyword in keywords:
+                rank.setdefault(keyword, index)
+    rank = {keyword: min(index for prefix, index in rank.items() if keyword.startswith(prefix))
+            for keyword in rank}
+    return re.compile('(?=(' + _trie_pattern(rank) + '))'), rank
+
+
+_SENDER_PATTERN, _SENDER_RANK = _compile('sender')
+_SUBJECT_PATTERN, _SUBJECT_RANK = _compile('subject')
+
+
+@lru_cache(maxsize=8192)
 def categorize_sender(sender: str, subject: str) -> str:
     """Categorize sender based on email content and sender name."""
-    sender_lower = (sender or '').lower()
-    subject_lower = (subject or '').lower()
-
-    if any(w in sender_lower for w in ['newsletter', 'digest', 'news', 'update', 'substack', 'medium']):
-        return 'Newsletters'
-    if any(w in sender_lower or w in subject_lower for w in ['promo', 'sale', 'deal', 'offer', 'discount', 'coupon', '$', 'fare', 'airline', 'hotel', 'booking']):
-        return 'Promotions'
-    if any(w in sender_lower for w in ['hospital', 'clinic', 'medical', 'health', 'doctor', 'pharmacy', 'appointment']):
-        return 'Healthcare'
-    if any(w in sender_lower for w in ['bank', 'credit', 'payment', 'invoice', 'billing', 'paypal', 'stripe', 'financial']):
-        return 'Financial'
-    if any(w in sender_lower for w in ['linkedin', 'twitter', 'facebook', 'instagram', 'social']):
-        return 'Social Media'
-    if any(w in sender_lower for w in ['job', 'career', 'recruiter', 'hiring', 'interview', 'application']):
-        return 'Work/Jobs'
-    if any(w in subject_lower for w in ['security', 'alert', 'login', 'password', 'verify', 'suspicious']):
-        return 'Security Alerts'
-    if any(w in sender_lower for w in ['amazon', 'ebay', 'shop', 'store', 'retail', 'delivery', 'shipping']):
-        return 'Shopping'
-    if any(w in sender_lower for w in ['github', 'stackoverflow', 'tech', 'software', 'developer', 'code']):
-        return 'Technology'
-    if any(w in sender_lower for w in ['university', 'school', 'course', 'education', 'learning', 'coursera', 'udemy']):
-        return 'Education'
-    if any(w in sender_lower for w in ['travel', 'trip', 'flight', 'airline', 'hotel', 'booking', 'expedia']):
-        return 'Travel'
-    if any(w in sender_lower for w in ['noreply', 'no-reply', 'notification', 'alert', 'reminder']):
-        return 'Notifications'
-
-    return 'Other'
+    best = len(CATEGORY_RULES)
+    for match in _SENDER_PATTERN.finditer((sender or '').lower()):
+        best = min(best, _SENDER_RANK[match.group(1)])
+    if best > 0:
+        for match in _SUBJECT_PATTERN.finditer((subject or '').lower()):
+            best = min(best, _SUBJECT_RANK[match.group(1)])
+    return CATEGORIES[best]
+
+
+def classify_email(sender: str, subject: str) -> Tuple[str, float]:
+    """
+    Category and confidence for an email, as stored in email_categories.
+
+    Confidence is 1.0 when a keyword rule matched and 0.0 for 'Other'.
+    """
+    category = categorize_sender(sender, subject)
+    return category, 0.0 if category == 'Other' else 1.0
+
+
+def email_category(email: Dict) -> str:
+    """Category of an email dict: the stored one if present, else computed."""
+    return email.get('category') or categorize_sender(email.get('sender', ''), email.get('subject', ''))
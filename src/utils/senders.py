@@ -0,0 +1,62 @@
+"""Sender address parsing shared by ingest, reputation and important-sender matching."""
+
+from email.utils import parseaddr
+from functools import lru_cache
+from typing import Dict, List, Tuple
+
+# Mailbox providers shared by unrelated people: feedback on one address there
+# says nothing about the rest, so they get no domain-level reputation
+SHARED_MAIL_DOMAINS = frozenset([
+    'gmail.com', 'googlemail.com', 'outlook.com', 'hotmail.com', 'live.com', 'msn.com',
+    'yahoo.com', 'ymail.com', 'icloud.com', 'me.com', 'mac.com', 'aol.com',
+    'proton.me', 'protonmail.com', 'gmx.com', 'gmx.de', 'mail.com', 'zoho.com', 'fastmail.com',
+])
+
+
+@lru_cache(maxsize=8192)
+def parse_sender(sender: str) -> Tuple[str, str]:
+    """
+    Canonical (address, domain) for a From header.
+
+    '"Jane Doe" <Jane@X.com>' -> ('jane@x.com', 'x.com'). Headers without a
+    usable address fall back to the lowercased text and an empty domain.
+    """
+    address = parseaddr(sender or '')[1].strip().lower()
+    if '@' not in address:
+        return (sender or '').strip().lower(), ''
+    return address, address.rsplit('@', 1)[1]
+
+
+def email_sender(email: Dict) -> Tuple[str, str]:
+    """(address, domain) stored with the email at ingest, or parsed from its sender."""
+    if email.get('sender_address') is not None:
+        return email['sender_address'], email.get('sender_domain') or ''
+    return parse_sender(email.get('sender', ''))
+
+
+def reputation_domain(domain: str) -> str:
+    """Key for domain-level reputation ('' for shared mailbox providers)."""
+    return '' if domain in SHARED_MAIL_DOMAINS else domain
+
+
+def normalize_sender_entry(entry: str) -> str:
+    """
+    Canonical key for a user-entered important sender.
+
+    Accepts an address ('boss@company.com', 'Boss <boss@company.com>') or a
+    domain ('company.com', '@company.com', '*@company.com'); addresses come
+    back as the lowercased address and domains as the bare domain.
+    """
+    entry = (entry or '').strip().lower()
+    if '<' in entry:
+        entry = parseaddr(entry)[1].lower()
+    entry = entry.lstrip('*')
+    if entry.startswith('@'):
+        return entry[1:]
+    return entry.lstrip('.')
+
+
+def domain_candidates(domain: str) -> List[str]:
+    """The domain and each parent domain: 'mail.x.com' -> ['mail.x.com', 'x.com']."""
+    parts = domain.split('.')
+    return ['.'.join(parts[i:]) for i in range(len(parts) - 1)] if domain else []
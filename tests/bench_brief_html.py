@@ -0,0 +1,55 @@
+"""
+Microbenchmark: brief rendering in src/utils/brief_html.py against the code it replaced.
+
+Run from the repository root:
+    python tests/bench_brief_html.py
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import timeit
+
+from src.utils.brief_html import brief_email_html, clean_brief_html
+from test_brief_html import reference_clean_brief_html, reference_email_html
+
+
+def sample_brief(emails: int = 50) -> str:
+    """A model reply with markdown slipped in, about six lines per email."""
+    lines = ['# Daily Brief', '=' * 20, '']
+    for i in range(1, emails + 1):
+        lines += [
+            f'## {i}. Quarterly planning follow-up',
+            f'<p>From **sender{i}@corp.com**: the draft needs your sign-off before Friday.</p>',
+            '- Review the **budget** section',
+            f'{i}. Reply to confirm the meeting',
+            '',
+            '',
+        ]
+    return '\n'.join(lines)
+
+
+def _time(function, text: str, number: int) -> float:
+    """Best of five runs, in milliseconds per call."""
+    return min(timeit.repeat(lambda: function(text), number=number, repeat=5)) / number * 1000
+
+
+def main():
+    text = sample_brief()
+    # The original appended each line to the document head
+    head = brief_email_html('').split('<br>')[0]
+    print(f"Brief: {len(text.splitlines())} lines, {len(text)} characters")
+    rows = [
+        ('clean_brief_html', reference_clean_brief_html, clean_brief_html, 200),
+        ('brief_email_html', lambda brief: reference_email_html(brief, head), brief_email_html, 2000),
+    ]
+    for name, before, after, number in rows:
+        old = _time(before, text, number)
+        new = _time(after, text, number)
+        print(f"{name}: {old:.3f} ms -> {new:.3f} ms ({old / new:.1f}x)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,181 @@
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httplib2
+import pytest
+from googleapiclient.errors import HttpError
+
+from src.email_connectors import gmail as gmail_module
+from src.email_connectors.gmail import GmailConnector
+from src.storage.database import Database
+
+
+@pytest.fixture
+def db_path(tmp_path) -> str:
+    """Path of a database file that does not exist yet."""
+    return str(tmp_path / 'email_brief.db')
+
+
+@pytest.fixture
+def db(db_path):
+    """A migrated Database on a fresh file (its pooled connection is closed afterwards)."""
+    database = Database(db_path)
+    yield database
+    database.close()
+
+
+class FakeRequest:
+    """A prepared API request; execute() returns (or raises) the canned response."""
+    
+    def __init__(self, respond, msg_id: str = None):
+        self.respond = respond
+        self.msg_id = msg_id
+    
+    def execute(self, num_retries: int = 0):
+        return self.respond()
+
+
+class FakeBatch:
+    """BatchHttpRequest stand-in: answers each added messages.get via the callback."""
+    
+    def __init__(self, service, callback):
+        self.service = service
+        self.callback = callback
+        self.requests = []
+    
+    def add(self, request, request_id):
+        self.requests.append((request_id, request))
+    
+    def execute(self):
+        self.service.batches.append([request_id for request_id, _ in self.requests])
+        if self.service.batch_failures:
+            self.service.batch_failures -= 1
+            raise ConnectionError('Connection reset by peer')
+        for request_id, request in self.requests:
+            try:
+                self.callback(request_id, request.execute(), None)
+            except HttpError as error:
+                self.callback(request_id, None, error)
+
+
+class FakeGmailService:
+    """
+    In-memory Gmail API: getProfile, history.list, messages.list/get and batches.
+    
+    Messages are added with add_message (newest last, each bumping the
+    historyId). statuses maps a message ID to HTTP errors its next gets
+    return, one per attempt; batch_failures fails whole batch calls and
+    failing_page the list call for that page token.
+    """
+    
+    def __init__(self, address: str = 'me@example.com'):
+        self.address = address
+        self.history_id = 100
+        self.oldest_history_id = 0  # history.list 404s for older start points
+        self.store = {}  # Message resources by ID
+        self.added = []  # (history_id, message_id)
+        self.statuses = {}
+        self.batch_failures = 0  # Whole batch calls to fail before answering
+        self.failing_page = None  # pageToken of list calls that fail with a 500
+        self.batches = []  # Message IDs of every batch call
+        self.history_starts = []
+    
+    def add_message(self, msg_id: str, subject: str = None):
+        self.history_id += 1
+        self.added.append((self.history_id, msg_id))
+        self.store[msg_id] = {
+            'id': msg_id, 'threadId': f't-{msg_id}', 'snippet': f'snippet {msg_id}',
+            'payload': {'headers': [
+                {'name': 'Subject', 'value': subject or f'subject {msg_id}'},
+                {'name': 'From', 'value': 'Sender <sender@example.com>'},
+                {'name': 'Date', 'value': 'Sat, 17 Oct 2026 09:30:00 +0000'},
+            ]},
+        }
+    
+    @staticmethod
+    def error(status: int) -> HttpError:
+        return HttpError(httplib2.Response({'status': status}), b'{}')
+    
+    @staticmethod
+    def _page(items: list, page_token: str, page_size: int) -> tuple:
+        start = int(page_token or 0)
+        end = start + page_size
+        return items[start:end], (str(end) if end < len(items) else None)
+    
+    # users() resources all resolve to this object
+    def users(self):
+        return self
+    
+    def history(self):
+        return FakeHistoryResource(self)
+    
+    def messages(self):
+        return FakeMessagesResource(self)
+    
+    def getProfile(self, userId):
+        return FakeRequest(lambda: {'emailAddress': self.address, 'historyId': str(self.history_id)})
+    
+    def new_batch_http_request(self, callback):
+        return FakeBatch(self, callback)
+
+
+class FakeHistoryResource:
+    def __init__(self, service: FakeGmailService):
+        self.service = service
+    
+    def list(self, userId, startHistoryId, historyTypes, maxResults, pageToken=None):
+        service = self.service
+        
+        def respond():
+            if pageToken is None:
+                service.history_starts.append(startHistoryId)
+            if int(startHistoryId) < service.oldest_history_id:
+                raise service.error(404)
+            if pageToken is not None and pageToken == service.failing_page:
+                raise service.error(500)
+            records = [{'id': str(history_id), 'messagesAdded': [{'message': {'id': msg_id, 'labelIds': ['INBOX']}}]}
+                       for history_id, msg_id in service.added if history_id > int(startHistoryId)]
+            page, next_token = service._page(records, pageToken, maxResults)
+            return {'history': page, 'nextPageToken': next_token} if next_token else {'history': page}
+        
+        return FakeRequest(respond)
+
+
+class FakeMessagesResource:
+    def __init__(self, service: FakeGmailService):
+        self.service = service
+    
+    def list(self, userId, q, maxResults, pageToken=None):
+        service = self.service
+        
+        def respond():
+            if pageToken is not None and pageToken == service.failing_page:
+                raise service.error(500)
+            newest_first = [{'id': msg_id} for _, msg_id in reversed(service.added)]
+            page, next_token = service._page(newest_first, pageToken, maxResults)
+            return {'messages': page, 'nextPageToken': next_token} if next_token else {'messages': page}
+        
+        return FakeRequest(respond)
+    
+    def get(self, userId, id, format, fields=None, metadataHeaders=None):
+        service = self.service
+        
+        def respond():
+            statuses = service.statuses.get(id)
+            if statuses:
+                raise service.error(statuses.pop(0))
+            if id not in service.store:
+                raise service.error(404)
+            return service.store[id]
+        
+        return FakeRequest(respond, id)
+
+
+@pytest.fixture
+def gmail(monkeypatch):
+    """A signed-in GmailConnector backed by FakeGmailService (backoff sleeps are skipped)."""
+    monkeypatch.setattr(gmail_module.time, 'sleep', lambda seconds: None)
+    connector = GmailConnector()
+    connector.service = FakeGmailService()
+    return connector
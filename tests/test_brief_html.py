@@ -0,0 +1,151 @@
+import random
+import re
+
+import pytest
+
+from src.utils.brief_html import BriefHtmlNormalizer, brief_email_html, clean_brief_html
+
+
+def reference_clean_brief_html(text: str, line_bounded: bool = False) -> str:
+    """
+    The clean-up brief_html replaced: whole-string regexes from BriefSummarizer.generate_brief.
+    
+    Args:
+        text: Model output
+        line_bounded: Keep each marker's whitespace on its line and require
+            content after it, the behavior BriefHtmlNormalizer implements
+    
+    Returns:
+        Cleaned brief HTML
+    """
+    space, content = (r'[^\S\n]', r'(\S.*)') if line_bounded else (r'\s', r'(.+)')
+    brief_html = text.strip()
+    brief_html = re.sub(rf'^=+{space}*$', '', brief_html, flags=re.MULTILINE)
+    brief_html = re.sub(rf'^###{space}+{content}$', r'<h3>\1</h3>', brief_html, flags=re.MULTILINE)
+    brief_html = re.sub(rf'^##{space}+{content}$', r'<h2>\1</h2>', brief_html, flags=re.MULTILINE)
+    brief_html = re.sub(rf'^#{space}+{content}$', r'<h1>\1</h1>', brief_html, flags=re.MULTILINE)
+    brief_html = re.sub(r'\*\*(.+?)\*\*', r'<strong>\1</strong>', brief_html)
+    brief_html = re.sub(rf'^[-*]{space}+{content}$', r'<li>\1</li>', brief_html, flags=re.MULTILINE)
+    brief_html = re.sub(rf'^\d+\.{space}+{content}$', r'<li>\1</li>', brief_html, flags=re.MULTILINE)
+    
+    result = []
+    in_list = False
+    for line in brief_html.split('\n'):
+        stripped = line.strip()
+        if stripped.startswith('<li>'):
+            if not in_list:
+                result.append('<ul>')
+                in_list = True
+            result.append(line)
+        elif stripped.startswith('</li>') or stripped.startswith('</ul>') or stripped.startswith('</ol>'):
+            if in_list:
+                result.append('</ul>')
+                in_list = False
+            result.append(line)
+        else:
+            if in_list and not stripped.startswith('<'):
+                result.append('</ul>')
+                in_list = False
+            result.append(line)
+    if in_list:
+        result.append('</ul>')
+    return re.sub(r'\n{3,}', '\n\n', '\n'.join(result))
+
+
+def reference_email_html(brief_text: str, html: str = "") -> str:
+    """The email body brief_email_html replaced (EmailDelivery._format_brief_html), appended to html."""
+    for line in brief_text.split('\n'):
+        if line.startswith('='):
+            html += f"<hr>"
+        elif line.startswith('📬'):
+            html += f"<h1>{line}</h1>"
+        elif line.startswith('From:') or line.startswith('Subject:'):
+            html += f"<p><strong>{line}</strong></p>"
+        elif line.strip():
+            html += f"<p>{line}</p>"
+        else:
+            html += "<br>"
+    return html
+
+
+def random_brief(rng: random.Random, tokens: int = 14) -> str:
+    """Random mix of markdown markers, HTML and text, for comparing implementations."""
+    pieces = ['#', '##', '###', ' ', '\n', '\n', '**', '*', '-', '1.', '12.', '=', '===', 'a', 'b c',
+              '<p>', '</ul>', '<li>x</li>', '\t', '  ']
+    return ''.join(rng.choice(pieces) for _ in range(rng.randint(0, tokens)))
+
+
+# Model output -> cleaned HTML, as the dashboard and cache store it
+GOLDEN = [
+    ('<h2>Critical Emails</h2>\n<p>Reply today.</p>', '<h2>Critical Emails</h2>\n<p>Reply today.</p>'),
+    ('# Daily Brief\n## Critical\n### Q3 plan', '<h1>Daily Brief</h1>\n<h2>Critical</h2>\n<h3>Q3 plan</h3>'),
+    ('#### Too deep\n#Missing space', '#### Too deep\n#Missing space'),
+    ('Daily Brief\n===========\nBody', 'Daily Brief\n\nBody'),
+    ('Please **reply** by **Friday**', 'Please <strong>reply</strong> by <strong>Friday</strong>'),
+    ('- one\n* two\n1. three\n12. four\nAfter',
+     '<ul>\n<li>one</li>\n<li>two</li>\n<li>three</li>\n<li>four</li>\n</ul>\nAfter'),
+    ('- one\n  <p>nested</p>\n- two', '<ul>\n<li>one</li>\n  <p>nested</p>\n<li>two</li>\n</ul>'),
+    ('<ul>\n- one\n</ul>\nDone', '<ul>\n<ul>\n<li>one</li>\n</ul>\n</ul>\nDone'),
+    ('\n\n  First\n\n\n\n\nSecond\n\n\n', 'First\n\nSecond'),
+    ('**bold\nacross** lines', '**bold\nacross** lines'),
+    ('', ''),
+]
+
+# Intended changes: markers apply to their own line only (model output, before, now)
+CHANGED = [
+    ('#\nfoo', '<h1>foo</h1>', '#\nfoo'),
+    ('Intro\n-  \nfoo', 'Intro\n<ul>\n<li>foo</li>\n</ul>', 'Intro\n-  \nfoo'),
+    ('3.\n\nfoo', '<ul>\n<li>foo</li>\n</ul>', '3.\n\nfoo'),
+    ('##  \nText', '<h2>Text</h2>', '##  \nText'),
+]
+
+
+@pytest.mark.parametrize('text, expected', GOLDEN)
+def test_golden_output(text, expected):
+    assert clean_brief_html(text) == expected
+    assert reference_clean_brief_html(text) == expected
+
+
+@pytest.mark.parametrize('text, before, now', CHANGED)
+def test_markers_do_not_reach_the_next_line(text, before, now):
+    assert reference_clean_brief_html(text) == before
+    assert clean_brief_html(text) == now
+
+
+@pytest.mark.parametrize('text', [text for text, _ in GOLDEN] + [text for text, _, _ in CHANGED])
+def test_streaming_matches_whole_text(text):
+    # Every split point, including one character at a time
+    for size in range(1, len(text) + 1):
+        normalizer = BriefHtmlNormalizer()
+        html = ''.join(normalizer.feed(text[i:i + size]) for i in range(0, len(text), size))
+        assert html + normalizer.close() == clean_brief_html(text)
+
+
+def test_matches_line_bounded_reference_on_random_input():
+    rng = random.Random(25)
+    for _ in range(20000):
+        # Trailing whitespace is left out: the last line keeps it when a line break follows
+        text = random_brief(rng).rstrip()
+        assert clean_brief_html(text) == reference_clean_brief_html(text, line_bounded=True), repr(text)
+        
+        cut = rng.randint(0, len(text))
+        normalizer = BriefHtmlNormalizer()
+        streamed = normalizer.feed(text[:cut]) + normalizer.feed(text[cut:]) + normalizer.close()
+        assert streamed == clean_brief_html(text), repr(text)
+
+
+def test_email_html_golden():
+    html = brief_email_html('📬 Daily Brief\n=====\nFrom: a@b.com\nSubject: Hi\n\nBody')
+    assert html.startswith('\n        <!DOCTYPE html>')
+    assert ('<body>\n        <h1>📬 Daily Brief</h1><hr><p><strong>From: a@b.com</strong></p>'
+            '<p><strong>Subject: Hi</strong></p><br><p>Body</p>\n            <div class="footer">') in html
+    assert html.endswith('</body>\n        </html>\n        ')
+
+
+def test_email_html_matches_reference():
+    rng = random.Random(26)
+    # An empty brief is the head, one <br> and the foot
+    document = brief_email_html('')
+    for _ in range(5000):
+        text = random_brief(rng).replace('#', '📬').replace('-', 'From:').replace('*', 'Subject:')
+        assert brief_email_html(text) == document.replace('<br>', reference_email_html(text)), repr(text)
@@ -0,0 +1,35 @@
+import sqlite3
+
+import numpy as np
+
+
+def _hold_write_lock(db_path: str) -> sqlite3.Connection:
+    """Another connection in the middle of a write transaction."""
+    writer = sqlite3.connect(db_path, isolation_level=None, timeout=0)
+    writer.execute('BEGIN IMMEDIATE')
+    return writer
+
+
+def test_cache_lookups_do_not_wait_for_the_writer(db, db_path):
+    db.save_cached_brief('brief', '<p>Brief</p>', 'model')
+    db.save_cached_embeddings({'key': np.ones(4, dtype=np.float32)})
+    
+    writer = _hold_write_lock(db_path)
+    try:
+        assert db.get_cached_brief('brief') == '<p>Brief</p>'
+        assert list(db.get_cached_embeddings(['key', 'missing'])) == ['key']
+    finally:
+        writer.execute('ROLLBACK')
+        writer.close()
+
+
+def test_cache_hits_count_for_eviction(db):
+    db.save_cached_brief('a', 'A', 'model', max_entries=2)
+    db.save_cached_brief('b', 'B', 'model', max_entries=2)
+    assert db.get_cached_brief('a') == 'A'
+    
+    # 'b' is now the least recently used, so it makes room for 'c'
+    db.save_cached_brief('c', 'C', 'model', max_entries=2)
+    assert db.get_cached_brief('a') == 'A'
+    assert db.get_cached_brief('b') is None
+    assert db.get_cached_brief('c') == 'C'
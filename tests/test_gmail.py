@@ -0,0 +1,59 @@
+from src.email_connectors import gmail as gmail_module
+
+
+def _add(service, count: int) -> list:
+    ids = [f'm{i}' for i in range(count)]
+    for msg_id in ids:
+        service.add_message(msg_id)
+    return ids
+
+
+def test_download_is_batched_in_order(gmail, monkeypatch):
+    monkeypatch.setattr(gmail_module, 'GMAIL_BATCH_SIZE', 2)
+    ids = _add(gmail.service, 5)
+    emails, unavailable = gmail.download_messages(list(reversed(ids)) + ['m0'])
+    
+    assert [email['id'] for email in emails] == list(reversed(ids)) + ['m0']
+    assert emails[0]['subject'] == 'subject m4' and emails[0]['body'] is None  # Metadata only
+    assert unavailable == []
+    assert gmail.service.batches == [['m4', 'm3'], ['m2', 'm1'], ['m0']]  # Duplicates requested once
+
+
+def test_partial_failures_are_retried(gmail):
+    ids = _add(gmail.service, 5)
+    gmail.service.statuses = {'m1': [503], 'm3': [429, 500]}
+    emails, unavailable = gmail.download_messages(ids)
+    
+    assert [email['id'] for email in emails] == ids
+    assert unavailable == []
+    assert gmail.service.batches == [ids, ['m1', 'm3'], ['m3']]
+
+
+def test_failed_batch_call_is_retried(gmail):
+    ids = _add(gmail.service, 3)
+    gmail.service.batch_failures = 1
+    emails, unavailable = gmail.download_messages(ids)
+    
+    assert [email['id'] for email in emails] == ids
+    assert gmail.service.batches == [ids, ids]
+
+
+def test_ids_still_failing_after_retries_are_unavailable(gmail, monkeypatch):
+    monkeypatch.setattr(gmail_module, 'GMAIL_MAX_RETRIES', 2)
+    ids = _add(gmail.service, 3)
+    gmail.service.statuses = {'m1': [503] * 10}
+    emails, unavailable = gmail.download_messages(ids)
+    
+    assert [email['id'] for email in emails] == ['m0', 'm2']
+    assert unavailable == ['m1']
+    assert gmail.service.batches == [ids, ['m1'], ['m1']]
+
+
+def test_missing_message_is_skipped_without_retry(gmail):
+    ids = _add(gmail.service, 2)
+    emails, unavailable = gmail.download_messages(ids + ['deleted'])
+    
+    # A 404 won't succeed on retry, and later syncs shouldn't wait for it
+    assert [email['id'] for email in emails] == ids
+    assert unavailable == []
+    assert gmail.service.batches == [ids + ['deleted']]
@@ -0,0 +1,68 @@
+import threading
+
+from src.ui.jobs import Job, JobManager
+
+
+def _wait(job: Job):
+    while not job.finished:
+        job.wait(job.revision, timeout=1)
+
+
+def test_job_cancelled_while_queued_never_runs():
+    manager = JobManager(max_workers=1)
+    release = threading.Event()
+    ran = []
+    blocker, _ = manager.submit('score', lambda job: release.wait(5))
+    queued, _ = manager.submit('fetch', lambda job: ran.append(job.id))
+    
+    queued.cancel()
+    release.set()
+    _wait(blocker)
+    manager._executor.shutdown(wait=True)
+    assert queued.status == 'cancelled' and ran == []
+
+
+def test_cancel_does_not_finish_a_running_job():
+    manager = JobManager(max_workers=1)
+    started = threading.Event()
+    release = threading.Event()
+    
+    def work(job):
+        started.set()
+        release.wait(5)
+        job.report(message='still going')
+    
+    job, _ = manager.submit('fetch', work)
+    started.wait(5)
+    job.cancel()
+    
+    # Still running until it stops at its next report, so no second run can start meanwhile
+    assert job.status == 'running'
+    assert manager.submit('fetch', work) == (job, False)
+    
+    release.set()
+    _wait(job)
+    assert job.status == 'cancelled'
+
+
+def test_cancel_racing_the_start_never_marks_a_running_job_cancelled():
+    for _ in range(200):
+        manager = JobManager(max_workers=1)
+        started = threading.Event()
+        release = threading.Event()
+        
+        def work(job):
+            started.set()
+            release.wait(5)
+            job.report()
+        
+        job, _ = manager.submit('fetch', work)
+        job.cancel()
+        
+        # Either the job never starts, or it is still 'running' (so no second run can start) until its report
+        if started.wait(0.01):
+            assert job.status == 'running'
+            assert manager.submit('fetch', work) == (job, False)
+        release.set()
+        manager._executor.shutdown(wait=True)
+        assert job.status == 'cancelled'
@@ -0,0 +1,156 @@
+import sqlite3
+
+import numpy as np
+import pytest
+
+from src.storage import migrations
+from src.storage.database import Database
+from src.storage.migrations import SCHEMA_VERSION, get_schema_version, migrate
+
+
+# Tables of the pre-versioning schema that hold data the migrations rewrite
+LEGACY_SCHEMA = '''
+    CREATE TABLE emails (
+        id TEXT PRIMARY KEY, subject TEXT, sender TEXT, date TEXT, snippet TEXT, body TEXT,
+        thread_id TEXT, account_type TEXT, importance_score REAL DEFAULT 0.0,
+        created_at TEXT DEFAULT CURRENT_TIMESTAMP
+    );
+    CREATE TABLE embeddings (
+        email_id TEXT PRIMARY KEY, embedding TEXT, created_at TEXT DEFAULT CURRENT_TIMESTAMP
+    );
+    CREATE TABLE feedback (
+        id INTEGER PRIMARY KEY AUTOINCREMENT, email_id TEXT, is_important INTEGER,
+        created_at TEXT DEFAULT CURRENT_TIMESTAMP
+    );
+    CREATE TABLE sender_patterns (
+        sender TEXT PRIMARY KEY, important_count INTEGER DEFAULT 0,
+        not_important_count INTEGER DEFAULT 0, last_updated TEXT DEFAULT CURRENT_TIMESTAMP
+    );
+    CREATE TABLE important_senders (
+        sender TEXT PRIMARY KEY, priority TEXT, category TEXT, notes TEXT,
+        created_at TEXT DEFAULT CURRENT_TIMESTAMP
+    );
+'''
+
+
+def _tables(db: Database) -> set:
+    cursor = db._connect().execute("SELECT name FROM sqlite_master WHERE type = 'table'")
+    return {row[0] for row in cursor.fetchall()}
+
+
+def _create_legacy_database(path: str):
+    """A database as written before schema versioning (user_version 0, TEXT embeddings, raw From headers)."""
+    conn = sqlite3.connect(path)
+    conn.executescript(LEGACY_SCHEMA)
+    conn.executemany('INSERT INTO emails (id, subject, sender, date, snippet) VALUES (?, ?, ?, ?, ?)', [
+        ('m1', 'Q3 plan', 'Bob Smith <Bob@Corp.com>', '2026-10-17T09:30:00+00:00', 'Draft attached'),
+        ('m2', 'Lunch?', 'bob@corp.com', '2026-10-17T12:00:00+00:00', 'Noon works'),
+        ('m3', 'Weekly deals', 'Shop <deals@shop.example>', 'not a date', '50% off'),
+    ])
+    conn.execute("INSERT INTO embeddings (email_id, embedding) VALUES ('m1', '0.5,0.25,-1.0')")
+    conn.executemany(
+        'INSERT INTO sender_patterns (sender, important_count, not_important_count, last_updated) VALUES (?, ?, ?, ?)', [
+            ('Bob Smith <Bob@Corp.com>', 2, 0, '2026-10-01 10:00:00'),
+            ('bob@corp.com', 1, 1, '2026-10-02 10:00:00'),
+            ('Alice <alice@corp.com>', 0, 3, '2026-09-01 10:00:00'),
+        ])
+    conn.executemany('INSERT INTO important_senders (sender, priority) VALUES (?, ?)', [
+        ('*@Family.com', 'high'),
+        ('Boss <Boss@Work.com>', 'medium'),
+        ('boss@work.com', 'low'),  # Same canonical key as above; the later row wins
+    ])
+    conn.commit()
+    conn.close()
+
+
+def test_fresh_database_is_created_at_current_version(db):
+    assert get_schema_version(db._connect()) == SCHEMA_VERSION
+    assert {'emails', 'embeddings', 'feedback', 'sender_patterns', 'domain_patterns', 'important_senders',
+            'embedding_cache', 'sync_state', 'data_version', 'brief_cache', 'email_summaries'} <= _tables(db)
+    assert db.get_data_version() == 0
+
+
+def test_pre_versioning_database_is_upgraded(db_path):
+    _create_legacy_database(db_path)
+    db = Database(db_path)
+    try:
+        conn = db._connect()
+        assert get_schema_version(conn) == SCHEMA_VERSION
+        
+        # TEXT embeddings become float32 BLOBs with the same values
+        value = conn.execute("SELECT embedding FROM embeddings WHERE email_id = 'm1'").fetchone()[0]
+        assert isinstance(value, bytes)
+        np.testing.assert_array_equal(db.get_embedding('m1'), np.array([0.5, 0.25, -1.0], dtype=np.float32))
+        assert conn.execute('SELECT COUNT(*) FROM embedding_cache').fetchone()[0] == 1
+        
+        # Emails gain a timestamp, parsed sender and category
+        rows = conn.execute('SELECT id, date_ts, sender_address, sender_domain FROM emails ORDER BY id').fetchall()
+        assert rows[0][1:] == (1792229400, 'bob@corp.com', 'corp.com')
+        assert rows[1][2] == 'bob@corp.com'
+        assert rows[2][1] is None  # Unparseable dates are left for the caller
+        assert conn.execute('SELECT COUNT(*) FROM email_categories').fetchone()[0] == 3
+        
+        # sender_patterns rows keyed by raw From headers merge per address; domains add up
+        senders = {row[0]: row[1:] for row in conn.execute(
+            'SELECT sender, important_count, not_important_count, last_updated FROM sender_patterns')}
+        assert senders == {
+            'bob@corp.com': (3, 1, '2026-10-02 10:00:00'),
+            'alice@corp.com': (0, 3, '2026-09-01 10:00:00'),
+        }
+        domains = dict(conn.execute('SELECT domain, important_count FROM domain_patterns').fetchall())
+        assert domains == {'corp.com': 3}
+        assert db.get_sender_reputation('Bob <bob@corp.com>') == 0.75
+        
+        # important_senders entries are stored under their canonical key
+        assert dict(conn.execute('SELECT sender, priority FROM important_senders').fetchall()) == {
+            'family.com': 'high',
+            'boss@work.com': 'low',
+        }
+    finally:
+        db.close()
+
+
+def test_partially_migrated_database_applies_only_pending_steps(db_path, monkeypatch):
+    conn = sqlite3.connect(db_path)
+    conn.execute(f'PRAGMA user_version = {SCHEMA_VERSION - 1}')
+    conn.close()
+    
+    applied = []
+    monkeypatch.setattr(migrations, 'MIGRATIONS', [
+        (number, lambda cursor, number=number: applied.append(number))
+        for number, _ in migrations.MIGRATIONS
+    ])
+    db = Database(db_path)
+    try:
+        assert applied == [SCHEMA_VERSION]
+        assert get_schema_version(db._connect()) == SCHEMA_VERSION
+    finally:
+        db.close()
+
+
+def test_current_database_skips_migration(db, monkeypatch):
+    def fail(cursor):
+        raise AssertionError('migration ran on a current database')
+    
+    monkeypatch.setattr(migrations, 'MIGRATIONS', [(number, fail) for number, _ in migrations.MIGRATIONS])
+    assert migrate(db) == 0
+    assert get_schema_version(db._connect()) == SCHEMA_VERSION
+
+
+def test_failed_migration_leaves_previous_version(db_path, monkeypatch):
+    def fail(cursor):
+        cursor.execute('CREATE TABLE half_done (id INTEGER)')
+        raise RuntimeError('boom')
+    
+    steps = list(migrations.MIGRATIONS)
+    steps[-1] = (SCHEMA_VERSION, fail)
+    monkeypatch.setattr(migrations, 'MIGRATIONS', steps)
+    db = Database.__new__(Database)
+    db.db_path = db_path
+    try:
+        with pytest.raises(RuntimeError):
+            migrate(db)
+        assert get_schema_version(db._connect()) == 0
+        assert 'emails' not in _tables(db) and 'half_done' not in _tables(db)
+    finally:
+        db.close()
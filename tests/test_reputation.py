@@ -0,0 +1,67 @@
+import pytest
+
+from src.utils.categories import email_category
+
+
+EMAIL = {
+    'id': 'm1', 'subject': 'Q3 plan', 'sender': 'Bob <bob@corp.com>', 'date': '2026-10-17T09:30:00+00:00',
+    'snippet': 'Draft attached', 'body': None, 'thread_id': 't1',
+}
+
+
+def _click(db, email_id: str, is_important: bool):
+    """Feedback as the dashboard saved it: the snapshot is read before the transaction commits."""
+    with db.transaction():
+        db.save_feedback(email_id, is_important)
+        email = db.get_email_by_id(email_id)
+        db.update_category_feedback(email_category(email), is_important)
+        
+        # Re-scoring reads the snapshot here; it must see this feedback too
+        snapshot = db.get_reputation_snapshot()
+        assert snapshot.sender_reputation('bob@corp.com', 'corp.com') == db.get_sender_reputation(email['sender'])
+
+
+def _assert_snapshot_matches_tables(db):
+    snapshot = db.get_reputation_snapshot()
+    cursor = db._connect().cursor()
+    for kind, table, column in (('sender', 'sender_patterns', 'sender'), ('domain', 'domain_patterns', 'domain'),
+                                ('category', 'category_patterns', 'category')):
+        cursor.execute(f'SELECT {column}, important_count, not_important_count FROM {table}')
+        assert {row[0]: [row[1], row[2]] for row in cursor.fetchall()} == snapshot._counts[kind]
+
+
+def test_feedback_read_inside_its_transaction_is_counted_once(db):
+    db.save_emails([EMAIL])
+    db.get_reputation_snapshot()  # Loaded before the first click, as on a dashboard view
+    
+    _click(db, 'm1', True)
+    _click(db, 'm1', False)
+    
+    snapshot = db.get_reputation_snapshot()
+    assert snapshot._counts['sender']['bob@corp.com'] == [1, 1]
+    assert snapshot.sender_reputation('bob@corp.com', 'corp.com') == db.get_sender_reputation(EMAIL['sender']) == 0.5
+    _assert_snapshot_matches_tables(db)
+
+
+def test_feedback_without_a_loaded_snapshot_is_counted_once(db):
+    db.save_emails([EMAIL])
+    
+    _click(db, 'm1', True)
+    _click(db, 'm1', False)
+    
+    _assert_snapshot_matches_tables(db)
+    assert db.get_reputation_snapshot().sender_reputation('bob@corp.com', 'corp.com') == 0.5
+
+
+def test_rolled_back_feedback_leaves_snapshot_unchanged(db):
+    db.save_emails([EMAIL])
+    db.get_reputation_snapshot()
+    
+    with pytest.raises(RuntimeError):
+        with db.transaction():
+            db.save_feedback('m1', True)
+            db.get_reputation_snapshot()
+            raise RuntimeError('abort')
+    
+    assert 'bob@corp.com' not in db.get_reputation_snapshot()._counts['sender']
+    _assert_snapshot_matches_tables(db)
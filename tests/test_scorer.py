@@ -0,0 +1,130 @@
+import hashlib
+import threading
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+from openai import BadRequestError
+
+from src.ai.scorer import ImportanceScorer
+
+
+def fake_embedding(text: str) -> list:
+    """Deterministic 8-dimensional vector for text."""
+    seed = int(hashlib.sha256(text.encode('utf-8')).hexdigest()[:8], 16)
+    return np.random.default_rng(seed).standard_normal(8).tolist()
+
+
+class FakeEmbeddings:
+    """Embeddings endpoint stand-in: rejects inputs in bad (400) and fails requests touching down."""
+    
+    def __init__(self):
+        self.requests = []  # Inputs of every request, in order
+        self.bad = set()
+        self.down = set()
+        self._lock = threading.Lock()
+    
+    def create(self, model, input):
+        with self._lock:
+            self.requests.append(list(input))
+        if self.bad & set(input):
+            response = SimpleNamespace(request=None, status_code=400, headers={})
+            raise BadRequestError('Invalid input', response=response, body=None)
+        if self.down & set(input):
+            raise ConnectionError('Connection error.')
+        return SimpleNamespace(data=[SimpleNamespace(index=i, embedding=fake_embedding(text))
+                                     for i, text in enumerate(input)])
+
+
+@pytest.fixture
+def scorer(db, monkeypatch):
+    monkeypatch.setenv('OPENAI_API_KEY', 'test')
+    scorer = ImportanceScorer(db)
+    scorer.embeddings = FakeEmbeddings()
+    scorer.client = SimpleNamespace(embeddings=scorer.embeddings)
+    scorer.concurrency = 1  # Requests go out in chunk order
+    return scorer
+
+
+def _emails(db, subjects, snippet='', sender='someone@example.com'):
+    emails = [{'id': f'{sender}/{i}/{subject}', 'sender': sender, 'subject': subject, 'date': '2026-10-17',
+               'snippet': snippet, 'body': None, 'thread_id': f't{i}'}
+              for i, subject in enumerate(subjects)]
+    db.save_emails(emails)
+    return emails
+
+
+def _sizes(scorer) -> list:
+    return [len(inputs) for inputs in scorer.embeddings.requests]
+
+
+def test_requests_respect_batch_size_and_token_budget(scorer, db):
+    scorer.batch_size = 4
+    scorer.score_emails(_emails(db, [f'subject {i}' for i in range(10)]))
+    assert _sizes(scorer) == [4, 4, 2]
+    
+    # About 41 estimated tokens each: two fit in a 100-token request, three don't
+    scorer.embeddings.requests = []
+    scorer.batch_tokens = 100
+    scorer.score_emails(_emails(db, [f'long {i}' for i in range(5)], snippet='x' * 115))
+    assert _sizes(scorer) == [2, 2, 1]
+
+
+def test_rejected_input_is_isolated_by_splitting(scorer, db):
+    emails = _emails(db, [f'subject {i}' for i in range(8)])
+    scorer.embeddings.bad = {'subject 0 '}
+    scorer.score_emails(emails)
+    
+    # The 400 is narrowed down by halving; only the bad input loses its embedding
+    assert _sizes(scorer) == [8, 4, 2, 1, 1, 2, 4]
+    assert db.get_embedding(emails[0]['id']) is None
+    assert all(db.get_embedding(email['id']) is not None for email in emails[1:])
+
+
+def test_failed_chunk_does_not_sink_the_others(scorer, db):
+    scorer.batch_size = 2
+    emails = _emails(db, [f'subject {i}' for i in range(6)])
+    scorer.embeddings.down = {'subject 2 '}
+    scorer.score_emails(emails)
+    
+    # Other errors are not split: the chunk is skipped once, the rest are embedded
+    assert _sizes(scorer) == [2, 2, 2]
+    assert [db.get_embedding(email['id']) is not None for email in emails] == [True, True, False, False, True, True]
+
+
+def test_email_that_failed_to_embed_gets_neutral_similarity(scorer, db):
+    important = _emails(db, ['Quarterly plan'], sender='boss@work.com')[0]
+    db.save_embedding(important['id'], fake_embedding('Quarterly plan '))
+    db.save_feedback(important['id'], True)
+    
+    matching, broken = _emails(db, ['Quarterly plan', 'Broken'])
+    scorer.embeddings.bad = {'Broken '}
+    matching_score, broken_score = scorer.score_emails([matching, broken])
+    
+    # Same sender and no keywords: only the similarity factor differs (0.35 at a perfect match vs neutral 0.175)
+    assert matching_score - broken_score == pytest.approx(0.35 - 0.175, abs=1e-6)
+
+
+def test_cached_embeddings_are_not_requested_again(scorer, db):
+    emails = _emails(db, ['alpha', 'beta', 'alpha'])
+    scorer.score_emails(emails)
+    assert scorer.embeddings.requests == [['alpha ', 'beta ']]  # Duplicate texts are embedded once
+    
+    scorer.score_emails(emails)
+    assert scorer.embeddings.requests == [['alpha ', 'beta ']]
+    
+    scorer.score_emails(emails + _emails(db, ['gamma']))
+    assert scorer.embeddings.requests[1:] == [['gamma ']]
+
+
+def test_important_sender_domain_raises_sender_reputation(scorer, db):
+    db.save_important_sender('*@Partner.com', 'high')
+    db.save_important_sender('ceo@client.com', 'low')
+    listed, parent, address, other = (_emails(db, ['Status update'], sender=sender)[0] for sender in (
+        'Ann <ann@partner.com>', 'bot@mail.partner.com', 'CEO <CEO@client.com>', 'someone@example.com'))
+    listed_score, parent_score, address_score, other_score = scorer.score_emails([listed, parent, address, other])
+    
+    # No feedback yet: everyone starts at the neutral 0.5 sender reputation
+    assert listed_score - other_score == pytest.approx((1.0 - 0.5) * 0.35)
+    assert parent_score == pytest.approx(listed_score)
+    assert address_score - other_score == pytest.approx((0.7 - 0.5) * 0.35)
@@ -0,0 +1,97 @@
+import re
+from types import SimpleNamespace
+
+import pytest
+
+from src.ai.summarizer import BriefSummarizer
+
+
+class FakeCompletions:
+    """Chat completions stand-in: numbered summaries for map requests, fixed HTML for the brief."""
+    
+    def __init__(self):
+        self.summarized = []  # Subjects sent to map requests
+        self.briefs = 0
+        self.brief_prompt = None
+        self.skip = set()  # Subjects the map reply leaves out
+        self.down = False
+    
+    def create(self, model, messages, temperature, max_tokens, stream=False):
+        if self.down:
+            raise ConnectionError('Connection error.')
+        prompt = messages[-1]['content']
+        if not stream:
+            items = re.findall(r'^(\d+)\. From: .*\n\s+Subject: (.*)$', prompt, flags=re.MULTILINE)
+            self.summarized.extend(subject for _, subject in items)
+            text = '\n'.join(f'{n}: About {subject}.' for n, subject in items if subject not in self.skip)
+            return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=text))])
+        self.briefs += 1
+        self.brief_prompt = prompt
+        return iter([SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=text))])
+                     for text in ('<h2>Critical', ' Emails</h2>\n<p>**Reply** today.</p>\n')])
+
+
+@pytest.fixture
+def summarizer(db, monkeypatch):
+    monkeypatch.setenv('OPENAI_API_KEY', 'test')
+    summarizer = BriefSummarizer(db)
+    summarizer.completions = FakeCompletions()
+    summarizer.client = SimpleNamespace(chat=SimpleNamespace(completions=summarizer.completions))
+    return summarizer
+
+
+def _emails(db, ids):
+    emails = [{'id': f'm{i}', 'sender': f'person{i}@corp.com', 'subject': f'subject {i}', 'date': '2026-10-17',
+               'snippet': f'snippet {i}', 'body': None, 'thread_id': f't{i}', 'importance_score': 0.9 - i / 100}
+              for i in ids]
+    db.save_emails(emails)
+    return emails
+
+
+def _cached_briefs(db) -> int:
+    return db._connect().execute('SELECT COUNT(*) FROM brief_cache').fetchone()[0]
+
+
+def test_brief_is_streamed_from_summaries(summarizer, db):
+    chunks = list(summarizer.stream_brief(_emails(db, range(5)), top_n=5))
+    assert ''.join(chunks) == '<h2>Critical Emails</h2>\n<p><strong>Reply</strong> today.</p>'
+    assert len(summarizer.completions.summarized) == 5 and summarizer.completions.briefs == 1
+
+
+def test_overlapping_window_summarizes_only_new_emails(summarizer, db):
+    # The default top 10, as the dashboard and CLI ask for it
+    summarizer.generate_brief(_emails(db, range(0, 10)))
+    assert len(summarizer.completions.summarized) == 10
+    
+    # The next window overlaps the first by half: only its new emails are summarized
+    summarizer.generate_brief(_emails(db, range(5, 15)))
+    assert sorted(summarizer.completions.summarized[10:]) == sorted(f'subject {i}' for i in range(10, 15))
+    assert summarizer.completions.briefs == 2
+    
+    # The brief is written from the summaries, stored ones included
+    assert 'About subject 5.' in summarizer.completions.brief_prompt
+    assert 'About subject 14.' in summarizer.completions.brief_prompt
+
+
+def test_brief_with_a_missing_summary_is_not_cached(summarizer, db):
+    emails = _emails(db, range(10))
+    summarizer.completions.skip = {'subject 3'}
+    summarizer.generate_brief(emails, top_n=10)
+    assert _cached_briefs(db) == 0
+    
+    # Next time only the missing email is summarized again, and the complete brief is cached
+    summarizer.completions.skip = set()
+    summarizer.generate_brief(emails, top_n=10)
+    assert summarizer.completions.summarized[10:] == ['subject 3']
+    assert _cached_briefs(db) == 1
+    
+    summarizer.generate_brief(emails, top_n=10)
+    assert summarizer.completions.briefs == 2
+
+
+def test_api_failure_shows_error_and_is_not_cached(summarizer, db):
+    summarizer.completions.down = True
+    brief = summarizer.generate_brief(_emails(db, range(10)), top_n=10)
+    assert brief.startswith('Error generating brief: Connection error.')
+    assert _cached_briefs(db) == 0
+    assert db.get_email_summaries({'m0': summarizer.summary_hash(_emails(db, [0])[0])}) == {}
@@ -0,0 +1,139 @@
+import threading
+import time
+
+from src.email_connectors import gmail as gmail_module
+from src.email_connectors import sync
+from src.email_connectors.sync import get_email_with_body, sync_cursor_key, sync_emails
+from conftest import FakeGmailService
+
+CURSOR = sync_cursor_key('gmail', 'me@example.com')
+
+
+def _ids(emails) -> list:
+    return sorted(email['id'] for email in emails)
+
+
+def test_cursor_is_kept_per_mailbox(db, gmail):
+    first = gmail.service
+    first.add_message('a1')
+    first.add_message('a2')
+    assert _ids(sync_emails(db, gmail)) == ['a1', 'a2']
+    assert db.get_sync_history_id(sync_cursor_key('gmail', 'Me@Example.com')) == '102'
+    
+    # A different account signs in: its sync must not start from the first mailbox's historyId
+    second = gmail.service = FakeGmailService('other@example.com')
+    second.add_message('b1')
+    assert _ids(sync_emails(db, gmail)) == ['b1']
+    assert second.history_starts == []
+    
+    # Back on the first account, sync resumes where that mailbox left off
+    first.add_message('a3')
+    gmail.service = first
+    assert _ids(sync_emails(db, gmail)) == ['a3']
+    assert first.history_starts == ['102']
+
+
+def test_clean_sync_advances_the_cursor(db, gmail, monkeypatch):
+    monkeypatch.setattr(gmail_module, 'GMAIL_PAGE_SIZE', 2)
+    for msg_id in ('a1', 'a2', 'a3'):
+        gmail.service.add_message(msg_id)
+    assert _ids(sync_emails(db, gmail)) == ['a1', 'a2', 'a3']
+    assert db.get_sync_history_id(CURSOR) == '103'
+    
+    # Incremental: only messages added since then, across history pages
+    for msg_id in ('a4', 'a5', 'a6'):
+        gmail.service.add_message(msg_id)
+    assert _ids(sync_emails(db, gmail)) == ['a4', 'a5', 'a6']
+    assert gmail.service.history_starts == ['103']
+    assert db.get_sync_history_id(CURSOR) == '106'
+
+
+def test_unavailable_message_keeps_the_cursor(db, gmail, monkeypatch):
+    monkeypatch.setattr(gmail_module, 'GMAIL_MAX_RETRIES', 1)
+    gmail.service.add_message('a1')
+    sync_emails(db, gmail)
+    
+    gmail.service.add_message('a2')
+    gmail.service.add_message('a3')
+    gmail.service.statuses = {'a2': [503, 503]}
+    assert _ids(sync_emails(db, gmail)) == ['a3']
+    assert db.get_sync_history_id(CURSOR) == '101'
+    
+    # The next sync replays from the old cursor and picks up the message it missed
+    assert _ids(sync_emails(db, gmail)) == ['a2']
+    assert gmail.service.history_starts == ['101', '101']
+    assert db.get_sync_history_id(CURSOR) == '103'
+
+
+def test_listing_error_keeps_the_cursor(db, gmail, monkeypatch):
+    monkeypatch.setattr(gmail_module, 'GMAIL_PAGE_SIZE', 1)
+    gmail.service.add_message('a1')
+    sync_emails(db, gmail)
+    
+    gmail.service.add_message('a2')
+    gmail.service.add_message('a3')
+    gmail.service.failing_page = '1'
+    assert _ids(sync_emails(db, gmail)) == ['a2']
+    assert db.get_sync_history_id(CURSOR) == '101'
+    
+    gmail.service.failing_page = None
+    assert _ids(sync_emails(db, gmail)) == ['a3']
+    assert db.get_sync_history_id(CURSOR) == '103'
+
+
+def test_expired_history_falls_back_to_a_capped_window(db, gmail, monkeypatch):
+    monkeypatch.setattr(gmail_module, 'GMAIL_PAGE_SIZE', 2)
+    gmail.service.add_message('a1')
+    sync_emails(db, gmail)
+    
+    for i in range(2, 8):
+        gmail.service.add_message(f'a{i}')
+    gmail.service.oldest_history_id = 105  # History before 105 has expired
+    
+    # Only the newest five are listed, over three pages; a2 is past the cap
+    assert _ids(sync_emails(db, gmail, max_messages=5)) == ['a3', 'a4', 'a5', 'a6', 'a7']
+    assert gmail.service.history_starts == ['101']
+    assert db.get_sync_history_id(CURSOR) == '107'
+
+
+class BodyConnector:
+    """GmailConnector stand-in for body downloads, recording instances and overlapping calls."""
+    
+    created = 0
+    active = 0
+    max_active = 0
+    
+    def __init__(self):
+        BodyConnector.created += 1
+    
+    def get_message_body(self, msg_id):
+        BodyConnector.active += 1
+        BodyConnector.max_active = max(BodyConnector.max_active, BodyConnector.active)
+        time.sleep(0.01)
+        BodyConnector.active -= 1
+        return f'body of {msg_id}'
+
+
+def test_body_downloads_share_one_connector(db, tmp_path, monkeypatch):
+    token = tmp_path / 'token.json'
+    token.write_text('{"account": "first"}')
+    monkeypatch.setattr(sync, 'GMAIL_TOKEN_FILE', str(token))
+    monkeypatch.setattr(sync, 'GmailConnector', BodyConnector)
+    monkeypatch.setattr(sync, '_body_gmail', None)
+    db.save_emails([{'id': f'm{i}', 'sender': 'a@example.com', 'subject': 's', 'date': '2026-10-17',
+                     'snippet': '', 'body': None, 'thread_id': 't'} for i in range(9)])
+    
+    # Each request runs on its own thread, as in the Flask dev server
+    threads = [threading.Thread(target=get_email_with_body, args=(db, f'm{i}')) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert db.get_email_by_id('m7')['body'] == 'body of m7'
+    assert BodyConnector.created == 1
+    assert BodyConnector.max_active == 1
+    
+    # New credentials (another account connected) replace the connector
+    token.write_text('{"account": "second account"}')
+    get_email_with_body(db, 'm8')
+    assert BodyConnector.created == 2